@@ -0,0 +1,44 @@
+# coding: utf-8
+"""Benchmark the construction of a large StyleSheet tree.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/build.py
+
+"""
+
+import timeit
+
+import qstylizer.style
+
+
+CLASSES = sorted(qstylizer.style.QCLASSES)
+SUBCONTROLS = sorted(qstylizer.style.QSUBCONTROLS)
+PSEUDOSTATES = sorted(qstylizer.style.QPSEUDOSTATES)
+
+
+def build(count=2000):
+    """Build a stylesheet with *count* rules holding five properties each."""
+    css = qstylizer.style.StyleSheet()
+    for index in range(count):
+        class_name = CLASSES[index % len(CLASSES)]
+        subcontrol = SUBCONTROLS[(index // len(CLASSES)) % len(SUBCONTROLS)]
+        pseudostate = PSEUDOSTATES[index % len(PSEUDOSTATES)]
+        rule = css[class_name][subcontrol][pseudostate]
+        rule.color.setValue("red")
+        rule.backgroundColor.setValue("#{0:06x}".format(index))
+        rule.border.setValue("1px solid black")
+        rule.margin.setValue("{0}px".format(index % 10))
+        rule.padding.setValue("2px")
+    return css
+
+
+def main():
+    for count in (500, 2000, 8000):
+        timer = timeit.Timer(lambda: build(count))
+        best = min(timer.repeat(repeat=3, number=1))
+        print("build {0:>5} rules: {1:8.1f} ms".format(count, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
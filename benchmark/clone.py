@@ -0,0 +1,57 @@
+# coding: utf-8
+"""Benchmark cloning a parsed theme with copy.deepcopy.
+
+The base theme is 1 MB generated by ``parse.py``. It is cloned once per
+"window", with and without changing a property in each clone, and the
+clones are output with toString.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/clone.py
+
+"""
+
+import copy
+import time
+import tracemalloc
+
+import qstylizer.parser
+
+from parse import generate
+
+
+def main(windows=20):
+    base = qstylizer.parser.parse(generate(1024 * 1024))
+    base.toString()
+    selector = next(iter(base._iter_rules())).selector
+
+    start = time.time()
+    clones = [copy.deepcopy(base) for _ in range(windows)]
+    print("deepcopy x{0}:             {1:8.3f} s".format(
+        windows, time.time() - start
+    ))
+
+    tracemalloc.start()
+    clone = copy.deepcopy(base)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("memory of one clone:        {0:8.1f} MB".format(
+        size / 1024.0 / 1024.0
+    ))
+    del clone
+
+    start = time.time()
+    for clone in clones:
+        clone.toString()
+    print("toString of the clones:     {0:8.3f} s".format(time.time() - start))
+
+    start = time.time()
+    for index, clone in enumerate(clones):
+        clone[selector].color.setValue("#{0:06x}".format(index))
+        clone.toString()
+    print("change 1 prop + toString:   {0:8.3f} s".format(time.time() - start))
+    assert clones[1].toString() != base.toString()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# coding: utf-8
+"""Benchmark loading a theme through the compiled stylesheet cache.
+
+The theme is 1 MB generated by ``parse.py``. The first load parses the file
+and writes the compiled file, the following loads only read it.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/compiled.py
+
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import timeit
+
+import qstylizer.compiled
+import qstylizer.parser
+
+from parse import generate
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "theme.qss")
+        with io.open(path, "w", encoding="utf-8") as fileobj:
+            fileobj.write(generate(1024 * 1024))
+        cache_dir = os.path.join(directory, "cache")
+
+        def parse():
+            with io.open(path, encoding="utf-8") as fileobj:
+                return qstylizer.parser.parse(fileobj.read())
+
+        def load():
+            return qstylizer.compiled.load(path, cache_dir=cache_dir)
+
+        best = min(timeit.Timer(parse).repeat(repeat=3, number=1))
+        print("parse:              {0:8.3f} s".format(best))
+        best = min(timeit.Timer(load).repeat(repeat=1, number=1))
+        print("load (cache miss):  {0:8.3f} s".format(best))
+        best = min(timeit.Timer(load).repeat(repeat=5, number=1))
+        print("load (cache hit):   {0:8.3f} s".format(best))
+        assert load().toString() == parse().toString()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
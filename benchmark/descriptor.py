@@ -0,0 +1,44 @@
+# coding: utf-8
+"""Benchmark fluent attribute access through the StyleRule descriptors.
+
+Time looking up existing rules and properties with chained attributes
+like ``css.QPushButton.hover.backgroundColor``, and setting a property
+value with ``css.QPushButton.hover.backgroundColor = "red"``.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/descriptor.py
+
+"""
+
+import time
+
+import qstylizer.style
+
+
+def get(css, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        css.QPushButton.hover.backgroundColor
+    return time.time() - start
+
+
+def set_(css, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        css.QPushButton.hover.backgroundColor = "red"
+    return time.time() - start
+
+
+def main(repeat=100000):
+    css = qstylizer.style.StyleSheet()
+    css.QPushButton.hover.backgroundColor = "red"
+    for label, function in (("get", get), ("set", set_)):
+        elapsed = min(function(css, repeat) for _ in range(5))
+        print("{0} x{1}, best of 5: {2:8.3f} s, {3:6.2f} us per access".format(
+            label, repeat, elapsed, elapsed / repeat / 3 * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
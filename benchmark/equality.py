@@ -0,0 +1,66 @@
+# coding: utf-8
+"""Benchmark comparing and diffing two equal 10k-rule StyleSheets.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/equality.py
+
+"""
+
+import timeit
+
+import qstylizer
+import qstylizer.style
+
+
+def build(rules=10000):
+    """Build a stylesheet with *rules* rules holding three properties each."""
+    css = qstylizer.style.StyleSheet()
+    for index in range(rules):
+        rule = css["#object{0}".format(index)].hover
+        rule.color.setValue("red")
+        rule.border.setValue("1px solid black")
+        rule.margin.setValue("{0}px".format(index % 10))
+    return css
+
+
+def main():
+    old = build()
+    new = build()
+    prop = new["#object5000"].hover.color
+    values = ["red", "blue"]
+
+    def compare():
+        return old == new
+
+    def change():
+        values.reverse()
+        prop.setValue(values[0])
+        return new.content_hash()
+
+    def change_and_compare():
+        change()
+        return old == new
+
+    best = min(timeit.Timer(compare).repeat(repeat=5, number=1))
+    print("compare equal sheets:        {0:8.1f} ms".format(best * 1000))
+    best = min(timeit.Timer(new.content_hash).repeat(repeat=1, number=1))
+    print("first content hash:          {0:8.1f} ms".format(best * 1000))
+    old.content_hash()
+    best = min(timeit.Timer(change).repeat(repeat=5, number=1))
+    print("rehash after 1 prop change:  {0:8.1f} ms".format(best * 1000))
+    best = min(
+        timeit.Timer(change_and_compare).repeat(repeat=5, number=1)
+    )
+    print("compare after 1 prop change: {0:8.1f} ms".format(best * 1000))
+
+    def change_and_diff():
+        change()
+        return qstylizer.diff(old, new)
+
+    best = min(timeit.Timer(change_and_diff).repeat(repeat=5, number=1))
+    print("diff after 1 prop change:    {0:8.1f} ms".format(best * 1000))
+
+
+if __name__ == "__main__":
+    main()
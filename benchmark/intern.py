@@ -0,0 +1,61 @@
+# coding: utf-8
+"""Benchmark the memory used by the names and values of a parsed theme.
+
+Count the string objects stored as keys, names and values in the rules of
+the 5 MB generated theme of ``parse.py``, and measure the memory allocated
+by the parsed StyleSheet with tracemalloc.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/intern.py
+
+"""
+
+import sys
+import collections
+import tracemalloc
+
+import qstylizer.parser
+import qstylizer.style
+
+from parse import generate
+
+
+def strings(css):
+    """Return the (total, objects, distinct) strings stored in the tree."""
+    stored = []
+    rules = [css]
+    while rules:
+        rule = rules.pop()
+        for key, child in collections.OrderedDict.items(rule):
+            stored.append(key)
+            stored.append(child._name)
+            if isinstance(child, qstylizer.style.StyleRule):
+                rules.append(child)
+            else:
+                stored.append(child._value)
+    objects = dict((id(string), string) for string in stored)
+    return len(stored), objects, set(stored)
+
+
+def main():
+    stylesheet = generate()
+    tracemalloc.start()
+    css = qstylizer.parser.parse(stylesheet)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    total, objects, distinct = strings(css)
+    print("tree:             {0:8.1f} MB".format(size / 1024.0 / 1024.0))
+    print("strings:          {0:8d} stored, {1} objects, {2} distinct".format(
+        total, len(objects), len(distinct)
+    ))
+    print("string objects:   {0:8.1f} MB".format(
+        sum(sys.getsizeof(string) for string in objects.values()) /
+        1024.0 / 1024.0
+    ))
+    print("names:            {0}".format(qstylizer.style.NAMES.info()))
+    print("values:           {0}".format(qstylizer.style.VALUES.info()))
+
+
+if __name__ == "__main__":
+    main()
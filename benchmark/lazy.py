@@ -0,0 +1,75 @@
+# coding: utf-8
+"""Benchmark parsing a large generated stylesheet in lazy mode.
+
+Compare a full parse with a lazy parse which only accesses 5% of the
+rules before outputting the stylesheet again.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/lazy.py
+
+"""
+
+import time
+
+import qstylizer.parser
+
+import parse
+
+
+def run(stylesheet, lazy):
+    """Parse, read the color of 5% of the rules and output the sheet."""
+    start = time.time()
+    css = qstylizer.parser.parse(stylesheet, lazy=lazy)
+    parsed = time.time()
+    for index, rule in enumerate(css._iter_rules()):
+        if index % 20 == 0:
+            rule.get("color")
+    accessed = time.time()
+    css.toString()
+    output = time.time()
+    return parsed - start, accessed - parsed, output - accessed
+
+
+def generate_unique(size=5 * 1024 * 1024):
+    """Generate a stylesheet where each selector is only used once."""
+    blocks = []
+    length = 0
+    index = 0
+    while length < size:
+        block = "{0}#object{1}::{2}:{3} {{\n{4}}}\n".format(
+            parse.CLASSES[index % len(parse.CLASSES)], index,
+            parse.SUBCONTROLS[index % len(parse.SUBCONTROLS)],
+            parse.PSEUDOSTATES[index % len(parse.PSEUDOSTATES)],
+            parse.DECLARATIONS.format(
+                index % 0xffffff, index % 256, index % 199, index % 97,
+                index % 8, index % 5, 8 + index % 6
+            )
+        )
+        blocks.append(block)
+        length += len(block)
+        index += 1
+    return "".join(blocks)
+
+
+def main():
+    for name, stylesheet in [
+        ("generated theme", parse.generate()),
+        ("unique selectors", generate_unique()),
+    ]:
+        print("{0}: {1:.1f} MB, {2} rule blocks".format(
+            name, len(stylesheet) / 1024.0 / 1024.0, stylesheet.count("{")
+        ))
+        for label, lazy in [("full", False), ("lazy", True)]:
+            parsed, accessed, output = run(stylesheet, lazy)
+            print(
+                "  {0}: parse {1:6.2f} s, access 5% {2:6.2f} s, "
+                "toString {3:6.2f} s, total {4:6.2f} s".format(
+                    label, parsed, accessed, output,
+                    parsed + accessed + output
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
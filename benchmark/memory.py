@@ -0,0 +1,46 @@
+# coding: utf-8
+"""Benchmark the memory used by a StyleSheet with 50k properties.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/memory.py
+
+"""
+
+import gc
+import time
+import tracemalloc
+
+import qstylizer.style
+
+
+PROPERTIES = [
+    "color", "background-color", "border", "margin", "padding",
+]
+
+
+def build(rules=10000):
+    """Build a stylesheet with *rules* rules holding five properties each."""
+    css = qstylizer.style.StyleSheet()
+    for index in range(rules):
+        rule = css["#object{0}".format(index)]
+        for prop in PROPERTIES:
+            rule[prop] = "{0}px".format(index % 10)
+    return css
+
+
+def main():
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    css = build()
+    elapsed = time.time() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("50k properties: {0:6.1f} MB current, {1:6.1f} MB peak, "
+          "{2:6.0f} ms".format(current / 1e6, peak / 1e6, elapsed * 1000))
+    return css
+
+
+if __name__ == "__main__":
+    main()
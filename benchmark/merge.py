@@ -0,0 +1,66 @@
+# coding: utf-8
+"""Benchmark merging 100 plugin stylesheets into a base theme.
+
+The base theme is 1 MB generated by ``parse.py``. Each plugin sheet restyles
+some of the base rules and adds rules of its own.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/merge.py
+
+"""
+
+import copy
+import time
+
+import qstylizer.parser
+
+from parse import generate
+
+
+def plugins(base, count=100, rules=60):
+    """Return the plugin stylesheets, parsed.
+
+    Each plugin restyles a slice of the base theme rules and adds rules
+    of its own.
+
+    """
+    blocks = [block + "}\n" for block in base.split("}\n")[:-1]]
+    sheets = []
+    for index in range(count):
+        start = (index * rules) % len(blocks)
+        chunk = [
+            block.replace("margin: 0;", "margin: {0}px;".format(index))
+            for block in blocks[start:start + rules]
+        ]
+        chunk += [
+            "QWidget#plugin{0}_{1}::item:hover {{ color: red; "
+            "margin: {1}px; }}\n".format(index, number)
+            for number in range(rules // 3)
+        ]
+        sheets.append(qstylizer.parser.parse("".join(chunk)))
+    return sheets
+
+
+def run(base, sheets, policy):
+    css = copy.deepcopy(base)
+    conflicts = 0
+    start = time.time()
+    for sheet in sheets:
+        conflicts += len(css.merge(sheet, policy=policy))
+    return time.time() - start, conflicts
+
+
+def main():
+    stylesheet = generate(1024 * 1024)
+    base = qstylizer.parser.parse(stylesheet)
+    sheets = plugins(stylesheet)
+    for policy in ("override", "keep"):
+        elapsed, conflicts = run(base, sheets, policy)
+        print("merge x100 ({0}): {1:8.3f} s, {2} conflicts".format(
+            policy, elapsed, conflicts
+        ))
+
+
+if __name__ == "__main__":
+    main()
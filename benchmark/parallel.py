@@ -0,0 +1,84 @@
+# coding: utf-8
+"""Benchmark parsing and merging 300 plugin stylesheet files.
+
+Each file holds a slice of the generated theme from ``parse.py`` with some
+selectors shared between files. The files are parsed one at a time and
+merged with ``StyleRule.update``, then with ``parse_many`` and 1, 2, 4 and
+8 worker processes.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/parallel.py
+
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import multiprocessing
+
+import qstylizer.parser
+import qstylizer.style
+
+from parse import generate
+
+
+def write_files(directory, count=300, size=8 * 1024):
+    """Write *count* stylesheet files of about *size* characters each."""
+    blocks = generate(count * size // 2).split("}\n")[:-1]
+    paths = []
+    for index in range(count):
+        # Every other file repeats the blocks of the previous one.
+        start = (index // 2 + index % 2) * len(blocks) // (count // 2 + 1)
+        chunk = blocks[start:start + len(blocks) // (count // 2)]
+        path = os.path.join(directory, "plugin{0}.qss".format(index))
+        with io.open(path, "w", encoding="utf-8") as fileobj:
+            fileobj.write(u"}\n".join(chunk) + u"}\n")
+        paths.append(path)
+    return paths
+
+
+def parse_serial(paths):
+    css = qstylizer.style.StyleSheet()
+    for path in paths:
+        with io.open(path, encoding="utf-8") as fileobj:
+            css.update(qstylizer.parser.parse(fileobj.read()))
+    return css
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        paths = write_files(directory)
+        size = sum(os.path.getsize(path) for path in paths)
+        print("{0} files, {1:.1f} MB, {2} processors".format(
+            len(paths), size / 1024.0 / 1024.0, multiprocessing.cpu_count()
+        ))
+
+        texts = []
+        for path in paths:
+            with io.open(path, encoding="utf-8") as fileobj:
+                texts.append(fileobj.read())
+        expected = qstylizer.parser.parse(u"".join(texts)).toString()
+
+        start = time.time()
+        parse_serial(paths)
+        print("parse + update:         {0:8.2f} s".format(
+            time.time() - start
+        ))
+        for workers in (1, 2, 4, 8):
+            start = time.time()
+            css = qstylizer.parser.parse_many(paths, workers=workers)
+            elapsed = time.time() - start
+            assert css.toString() == expected
+            print("parse_many workers={0}:   {1:8.2f} s".format(
+                workers, elapsed
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# coding: utf-8
+"""Benchmark parsing a large generated Qt stylesheet.
+
+The generated theme is about 5 MB, with rules styling each class, object
+name, subcontrol and pseudostate combination and some comma lists.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/parse.py
+
+"""
+
+import time
+
+import qstylizer.parser
+import qstylizer.style
+
+
+CLASSES = sorted(qstylizer.style.QCLASSES)
+SUBCONTROLS = sorted(qstylizer.style.QSUBCONTROLS)
+PSEUDOSTATES = sorted(qstylizer.style.QPSEUDOSTATES)
+
+DECLARATIONS = (
+    "    color: #{0:06x};\n"
+    "    background-color: rgb({1}, {2}, {3});\n"
+    "    border: 1px solid #{0:06x};\n"
+    "    border-radius: {4}px;\n"
+    "    padding: {4}px {5}px;\n"
+    "    margin: 0;\n"
+    "    font: {6}pt \"Sans Serif\";\n"
+)
+
+
+def generate(size=5 * 1024 * 1024):
+    """Generate a stylesheet of at least *size* characters."""
+    blocks = []
+    length = 0
+    index = 0
+    while length < size:
+        class_name = CLASSES[index % len(CLASSES)]
+        subcontrol = SUBCONTROLS[(index // len(CLASSES)) % len(SUBCONTROLS)]
+        pseudostate = PSEUDOSTATES[index % len(PSEUDOSTATES)]
+        if index % 4 == 0:
+            selector = "{0}#object{1}".format(class_name, index)
+        elif index % 4 == 1:
+            selector = "{0}::{1}:{2}".format(
+                class_name, subcontrol, pseudostate
+            )
+        elif index % 4 == 2:
+            selector = "{0} QLabel#label{1}:{2}".format(
+                class_name, index, pseudostate
+            )
+        else:
+            selector = "{0}:{1}, {2}::{3}".format(
+                class_name, pseudostate, class_name, subcontrol
+            )
+        block = "{0} {{\n{1}}}\n".format(
+            selector, DECLARATIONS.format(
+                index % 0xffffff, index % 256, index % 199, index % 97,
+                index % 8, index % 5, 8 + index % 6
+            )
+        )
+        blocks.append(block)
+        length += len(block)
+        index += 1
+    return "".join(blocks)
+
+
+def main():
+    stylesheet = generate()
+    print("stylesheet: {0:.1f} MB, {1} rule blocks".format(
+        len(stylesheet) / 1024.0 / 1024.0, stylesheet.count("{")
+    ))
+    start = time.time()
+    qstylizer.parser.parse(stylesheet)
+    print("parse:                       {0:8.2f} s".format(time.time() - start))
+
+
+if __name__ == "__main__":
+    main()
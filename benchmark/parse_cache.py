@@ -0,0 +1,42 @@
+# coding: utf-8
+"""Benchmark parsing small inline stylesheets made from a few templates.
+
+10,000 stylesheets are parsed from 5 templates, with and without the parse
+cache enabled.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/parse_cache.py
+
+"""
+
+import time
+
+import qstylizer.parser
+
+
+TEMPLATES = [
+    "QPushButton {{ color: {0}; border: 1px solid {0}; padding: 2px; }}\n"
+    "QPushButton:hover {{ background-color: {0}; }}\n"
+    "QPushButton:pressed {{ background-color: black; color: white; }}\n"
+    .format(color)
+    for color in ("red", "green", "blue", "#336699", "rgb(10, 20, 30)")
+]
+
+
+def run(count=10000):
+    start = time.time()
+    for index in range(count):
+        qstylizer.parser.parse(TEMPLATES[index % len(TEMPLATES)])
+    return time.time() - start
+
+
+def main():
+    print("parse x10000, no cache:  {0:8.3f} s".format(run()))
+    qstylizer.parser.enable_cache()
+    print("parse x10000, cache:     {0:8.3f} s".format(run()))
+    print(qstylizer.parser.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# coding: utf-8
+"""Benchmark pickling a StyleSheet as an object tree and as records.
+
+The StyleSheet is parsed from a 1 MB theme generated by ``parse.py``.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/records.py
+
+"""
+
+import copy
+import pickle
+import timeit
+
+import qstylizer.parser
+import qstylizer.style
+
+from parse import generate
+
+
+def measure(function, repeat=3):
+    """Return the result of function and its best time in seconds."""
+    timer = timeit.Timer(function)
+    best = min(timer.repeat(repeat=repeat, number=1))
+    return function(), best
+
+
+def main():
+    css = qstylizer.parser.parse(generate(1024 * 1024))
+    protocol = pickle.HIGHEST_PROTOCOL
+
+    data, dump_time = measure(lambda: pickle.dumps(css, protocol))
+    _, load_time = measure(lambda: pickle.loads(data))
+    print("object tree: {0:8.2f} MB  dumps {1:6.3f} s  loads {2:6.3f} s".format(
+        len(data) / 1024.0 / 1024.0, dump_time, load_time
+    ))
+
+    data, dump_time = measure(lambda: pickle.dumps(css.to_records(), protocol))
+    _, load_time = measure(
+        lambda: qstylizer.style.StyleSheet.from_records(pickle.loads(data))
+    )
+    print("records:     {0:8.2f} MB  dumps {1:6.3f} s  loads {2:6.3f} s".format(
+        len(data) / 1024.0 / 1024.0, dump_time, load_time
+    ))
+
+    _, best = measure(lambda: copy.deepcopy(css))
+    print("deepcopy:                   {0:6.3f} s".format(best))
+    _, best = measure(
+        lambda: qstylizer.style.StyleSheet.from_records(css.to_records())
+    )
+    print("from_records(to_records()): {0:6.3f} s".format(best))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# coding: utf-8
+"""Benchmark re-rendering a 10k-rule StyleSheet after a single change.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/render.py
+
+"""
+
+import timeit
+
+import qstylizer.style
+
+
+def build(rules=10000):
+    """Build a stylesheet with *rules* rules holding three properties each."""
+    css = qstylizer.style.StyleSheet()
+    for index in range(rules):
+        rule = css["#object{0}".format(index)].hover
+        rule.color.setValue("red")
+        rule.border.setValue("1px solid black")
+        rule.margin.setValue("{0}px".format(index % 10))
+    return css
+
+
+def main():
+    css = build()
+    css.toString()
+    prop = css["#object5000"].hover.color
+    values = ["red", "blue"]
+
+    def change():
+        values.reverse()
+        prop.setValue(values[0])
+        return css.toString()
+
+    best = min(timeit.Timer(css.toString).repeat(repeat=5, number=1))
+    print("full render of 10k rules:    {0:8.1f} ms".format(best * 1000))
+    best = min(timeit.Timer(change).repeat(repeat=5, number=1))
+    print("render after 1 prop change:  {0:8.1f} ms".format(best * 1000))
+
+
+if __name__ == "__main__":
+    main()
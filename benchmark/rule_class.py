@@ -0,0 +1,51 @@
+# coding: utf-8
+"""Benchmark classifying rule names with rule_class.
+
+The names are the components of the rules of the generated theme of
+``parse.py``: classes, subcontrols, pseudostates, negated pseudostates,
+object names and descendant classes.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/rule_class.py
+
+"""
+
+import time
+
+import qstylizer.style
+
+from parse import generate
+
+
+def names():
+    """Return the names of the rules created for the generated theme."""
+    result = []
+    for selector in generate(512 * 1024).split("{")[:-1]:
+        selector = selector.rsplit("}", 1)[-1].strip()
+        for part in selector.split(","):
+            result.extend(
+                qstylizer.style.StyleRule.split_selector(part.strip())
+            )
+    return result + [":!" + name for name in qstylizer.style.QPSEUDOSTATES]
+
+
+def classify(rule_names, repeat):
+    rule_class = qstylizer.style.rule_class
+    start = time.time()
+    for _ in range(repeat):
+        for name in rule_names:
+            rule_class(name)
+    return time.time() - start
+
+
+def main(repeat=50):
+    rule_names = names()
+    elapsed = min(classify(rule_names, repeat) for _ in range(5))
+    print("rule_class x{0}, best of 5: {1:8.3f} s".format(
+        repeat * len(rule_names), elapsed
+    ))
+
+
+if __name__ == "__main__":
+    main()
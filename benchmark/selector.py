@@ -0,0 +1,45 @@
+# coding: utf-8
+"""Benchmark selector computation on deep StyleRule trees.
+
+Every iteration resets the cached selectors along the chain so that all
+of the scope operators and leaf checks are computed again.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/selector.py
+
+"""
+
+import timeit
+
+import qstylizer.style
+
+
+def build(depth, width=20):
+    """Build a chain of generic rules, each with *width* properties."""
+    css = qstylizer.style.StyleSheet()
+    chain = [css]
+    for level in range(depth):
+        rule = chain[-1]["level{0}".format(level)]
+        for index in range(width):
+            rule["prop{0}".format(index)] = index
+        chain.append(rule)
+    return chain
+
+
+def main():
+    for depth in (4, 16, 64):
+        chain = build(depth)
+
+        def compute():
+            for rule in chain:
+                rule.__dict__["_selector"] = None
+            return chain[-1].selector
+
+        timer = timeit.Timer(compute)
+        best = min(timer.repeat(repeat=5, number=200)) / 200
+        print("selector depth {0:>3}: {1:8.1f} us".format(depth, best * 1e6))
+
+
+if __name__ == "__main__":
+    main()
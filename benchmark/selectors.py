@@ -0,0 +1,50 @@
+# coding: utf-8
+"""Benchmark creating rules from deep selectors.
+
+Each selector has five components, like
+"QTreeView QLabel#label12::branch:!has-children". The rules are created
+in a new StyleSheet, then looked up again.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/selectors.py
+
+"""
+
+import time
+
+import qstylizer.style
+
+
+CLASSES = sorted(qstylizer.style.QCLASSES)
+SUBCONTROLS = sorted(qstylizer.style.QSUBCONTROLS)
+PSEUDOSTATES = sorted(qstylizer.style.QPSEUDOSTATES)
+
+
+def selectors(count=20000):
+    """Return *count* distinct selectors of five components."""
+    return [
+        "{0} QLabel#label{1}::{2}:!{3}".format(
+            CLASSES[index % len(CLASSES)], index,
+            SUBCONTROLS[index % len(SUBCONTROLS)],
+            PSEUDOSTATES[index % len(PSEUDOSTATES)]
+        )
+        for index in range(count)
+    ]
+
+
+def main():
+    names = selectors()
+    css = qstylizer.style.StyleSheet()
+    start = time.time()
+    for name in names:
+        css.create_child_rules(name)
+    print("create x{0}: {1:8.3f} s".format(len(names), time.time() - start))
+    start = time.time()
+    for name in names:
+        css.create_child_rules(name)
+    print("lookup x{0}: {1:8.3f} s".format(len(names), time.time() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# coding: utf-8
+"""Benchmark the peak memory of parsing a large stylesheet file.
+
+Compare reading the whole file and tokenizing it at once against
+streaming its rule blocks with :func:`qstylizer.parser.iter_parse` and
+scanning a memory-mapped file as done by :func:`qstylizer.parser.parse_mmap`.
+
+Run from the repository root::
+
+    PYTHONPATH=. python benchmark/stream.py
+
+"""
+
+import io
+import os
+import mmap
+import time
+import tempfile
+import tracemalloc
+
+import tinycss2
+
+import qstylizer.parser
+
+import parse
+
+
+def measure(function, path):
+    """Return the time and peak traced memory of function(path)."""
+    tracemalloc.start()
+    start = time.time()
+    function(path)
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def tokenize_whole(path):
+    with io.open(path, encoding="utf-8") as fileobj:
+        nodes = tinycss2.parse_stylesheet(
+            fileobj.read(), skip_comments=True, skip_whitespace=True
+        )
+    for node in nodes:
+        tinycss2.parse_declaration_list(node.content)
+
+
+def tokenize_streamed(path):
+    with io.open(path, encoding="utf-8") as fileobj:
+        for _ in qstylizer.parser.iter_parse(fileobj):
+            pass
+
+
+def tokenize_mapped(path):
+    with io.open(path, "rb") as fileobj:
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        for _ in qstylizer.parser._iter_parsed_blocks(
+            qstylizer.parser._iter_mapped_blocks(mapped, "utf-8")
+        ):
+            pass
+        mapped.close()
+
+
+def scan_mapped(path):
+    with io.open(path, "rb") as fileobj:
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        for _ in qstylizer.parser._BlockScanner(b"").scan(mapped):
+            pass
+        mapped.close()
+
+
+def main():
+    stylesheet = parse.generate(4 * 1024 * 1024)
+    handle, path = tempfile.mkstemp(suffix=".qss")
+    try:
+        with io.open(handle, "w", encoding="utf-8") as fileobj:
+            fileobj.write(stylesheet)
+        print("stylesheet: {0:.1f} MB".format(
+            os.path.getsize(path) / 1024.0 / 1024.0
+        ))
+        del stylesheet
+        for label, function in [
+            ("read whole file + tokenize", tokenize_whole),
+            ("iter_parse", tokenize_streamed),
+            ("mmap", tokenize_mapped),
+            ("mmap block scan only", scan_mapped),
+        ]:
+            elapsed, peak = measure(function, path)
+            print("{0:28} {1:8.2f} s {2:10.1f} MB peak".format(
+                label + ":", elapsed, peak / 1024.0 / 1024.0
+            ))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
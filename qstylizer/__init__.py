@@ -1 +1,14 @@
 # coding: utf-8
+
+
+def diff(old, new):
+    """Return the differences between two StyleSheet trees.
+
+    See :func:`qstylizer.patch.diff`.
+
+    :param old: The original StyleSheet
+    :param new: The updated StyleSheet
+
+    """
+    import qstylizer.patch
+    return qstylizer.patch.diff(old, new)
@@ -0,0 +1,250 @@
+# coding: utf-8
+
+import threading
+import collections
+
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo",
+    ["hits", "misses", "evictions", "size", "maxsize", "bytes", "maxbytes"]
+)
+CacheInfo.__new__.__defaults__ = (0, None)
+
+InternInfo = collections.namedtuple("InternInfo", ["total", "unique", "maxsize"])
+
+
+class LRUCache(object):
+    """Bounded, thread-safe least-recently-used cache.
+
+    Keeps hit, miss and eviction counters that can be retrieved with
+    :meth:`info`. The cache can be bounded by the number of entries, the
+    total size of the entries given by a *sizeof* function, or both.
+
+    .. code-block:: python
+
+        >>> cache = LRUCache(maxsize=2)
+        >>> cache.get_or_set("key", lambda key: key.upper())
+        'KEY'
+        >>> cache.info()
+        CacheInfo(hits=0, misses=1, evictions=0, size=1, maxsize=2, bytes=0,
+                  maxbytes=None)
+
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None, sizeof=None):
+        """Initialize the LRUCache instance.
+
+        :param maxsize: The maximum number of entries. None means unbounded.
+        :param maxbytes: The maximum total size of the entries. None means
+            unbounded.
+        :param sizeof: Function called with the key and value of an entry
+            to return its size. Required if *maxbytes* is set.
+
+        """
+        if maxbytes is not None and sizeof is None:
+            raise ValueError("A sizeof function is required with maxbytes")
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._sizeof = sizeof
+        self._bytes = 0
+        self._sizes = {}
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @property
+    def maxbytes(self):
+        return self._maxbytes
+
+    def get(self, key, default=None):
+        """Return the value cached for key or default on a miss.
+
+        :param key: A hashable key
+
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._touch(key)
+            self._hits += 1
+            return value
+
+    def set(self, key, value):
+        """Cache value for key, evicting the oldest entries if full.
+
+        :param key: A hashable key
+        :param value: The value to cache
+
+        """
+        with self._lock:
+            self._data[key] = value
+            if self._sizeof is not None:
+                size = self._sizeof(key, value)
+                self._bytes += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+            self._touch(key)
+            self._evict()
+
+    def get_or_set(self, key, factory):
+        """Return the value cached for key, computing it on a miss.
+
+        :param key: A hashable key
+        :param factory: Function called with key to compute a missing value
+
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._touch(key)
+                self._hits += 1
+                return value
+
+        value = factory(key)
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def info(self):
+        """Return a :class:`CacheInfo` with the current statistics."""
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions,
+                len(self._data), self._maxsize, self._bytes, self._maxbytes
+            )
+
+    def _touch(self, key):
+        """Mark key as the most recently used entry."""
+        try:
+            self._data.move_to_end(key)
+        except AttributeError:
+            self._data[key] = self._data.pop(key)
+
+    def _evict(self):
+        """Drop the least recently used entries until the cache fits.
+
+        An entry larger than *maxbytes* on its own is dropped right away.
+
+        """
+        maxsize = self._maxsize
+        maxbytes = self._maxbytes
+        while self._data and (
+            (maxsize is not None and len(self._data) > maxsize) or
+            (maxbytes is not None and self._bytes > maxbytes)
+        ):
+            key, _ = self._data.popitem(last=False)
+            self._bytes -= self._sizes.pop(key, 0)
+            self._evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class InternTable(object):
+    """Thread-safe table sharing a single object for equal values.
+
+    Interning the names and values stored in many rules of a tree keeps one
+    string object for each distinct string. The statistics retrieved with
+    :meth:`info` report how many values were interned and how many of them
+    were unique. The table is cleared when it grows over *maxsize* entries,
+    which only stops the values interned before from being shared.
+
+    Values are often interned once by a function memoized in an
+    :class:`LRUCache`, which returns the interned value on later calls
+    without interning it again. Pass these caches as *memos* so that their
+    hits are counted in the total as well.
+
+    .. code-block:: python
+
+        >>> table = InternTable()
+        >>> table.intern("".join(["co", "lor"])) is table.intern("color")
+        True
+        >>> table.info()
+        InternInfo(total=2, unique=1, maxsize=65536)
+
+    """
+
+    def __init__(self, maxsize=65536, memos=()):
+        """Initialize the InternTable instance.
+
+        :param maxsize: The maximum number of entries. None means unbounded.
+        :param memos: LRUCaches of functions returning interned values.
+
+        """
+        self._maxsize = maxsize
+        self._memos = tuple(memos)
+        self._data = {}
+        self._lock = threading.Lock()
+        self._total = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    def intern(self, value):
+        """Return the interned object equal to value.
+
+        :param value: A hashable value
+
+        """
+        with self._lock:
+            self._total += 1
+            try:
+                return self._data[value]
+            except KeyError:
+                pass
+            if self._maxsize is not None and len(self._data) >= self._maxsize:
+                self._data.clear()
+            self._data[value] = value
+            return value
+
+    def clear(self):
+        """Remove all entries and reset the counters.
+
+        The hits of the memos are only reset by clearing the memos.
+
+        """
+        with self._lock:
+            self._data.clear()
+            self._total = 0
+
+    def info(self):
+        """Return an :class:`InternInfo` with the current statistics."""
+        hits = sum(memo.info().hits for memo in self._memos)
+        with self._lock:
+            return InternInfo(
+                self._total + hits, len(self._data), self._maxsize
+            )
+
+    def __contains__(self, value):
+        with self._lock:
+            return value in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
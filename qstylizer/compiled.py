@@ -0,0 +1,266 @@
+# coding: utf-8
+
+import io
+import os
+import json
+import hashlib
+import tempfile
+
+import qstylizer.parser
+import qstylizer.style
+
+
+#: Version of the compiled file format, included in the cache keys.
+FORMAT_VERSION = 2
+
+#: Extension of the compiled files in the cache directory.
+EXTENSION = ".qsc"
+
+_version = None
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _STRING_TYPES = (str,)
+
+_VALUE_TYPES = _STRING_TYPES + (int, float)
+
+
+def load(path, cache_dir=None, encoding="utf-8"):
+    """Return the StyleSheet of a stylesheet file using a compiled cache.
+
+    The cache key is a hash of the content of the file along with the
+    qstylizer version. When the cache directory holds a compiled file for
+    the key, the StyleSheet is rebuilt from its records with a single read
+    and no parsing. Otherwise the file is parsed and the compiled file is
+    written for next time.
+
+    Compiled files hold the records of :meth:`StyleRule.to_records
+    <qstylizer.style.StyleRule.to_records>` as JSON, so a file written to
+    the cache directory by someone else cannot run code when it is loaded.
+    Files which do not hold valid records are ignored and replaced.
+
+    Compiled files are written to a temporary file which is then renamed,
+    so concurrent processes never read a partially written file. Failing to
+    write the cache does not prevent the StyleSheet from being returned.
+
+    .. code-block:: python
+
+        >>> css = qstylizer.compiled.load("theme.qss")
+
+    :param path: The path of the stylesheet file.
+    :param cache_dir: The directory of the compiled files. Defaults to
+        :func:`default_cache_dir`.
+    :param encoding: The encoding of the stylesheet file.
+
+    """
+    with io.open(path, "rb") as fileobj:
+        source = fileobj.read()
+    cache_path = compiled_path(source, cache_dir, encoding)
+
+    records = _read(cache_path)
+    if records is not None:
+        return qstylizer.style.StyleSheet.from_records(records)
+
+    css = qstylizer.parser.parse(source.decode(encoding))
+    _write(cache_path, css.to_records())
+    return css
+
+
+def compiled_path(source, cache_dir=None, encoding="utf-8"):
+    """Return the path of the compiled file for the source of a stylesheet.
+
+    :param source: The content of the stylesheet file as bytes.
+    :param cache_dir: The directory of the compiled files. Defaults to
+        :func:`default_cache_dir`.
+    :param encoding: The encoding of the stylesheet file.
+
+    """
+    key = hashlib.sha256(
+        "{0}:{1}:{2}\n".format(
+            _qstylizer_version(), FORMAT_VERSION, encoding
+        ).encode("utf-8")
+    )
+    key.update(source)
+    return os.path.join(
+        cache_dir or default_cache_dir(), key.hexdigest() + EXTENSION
+    )
+
+
+def default_cache_dir():
+    """Return the default directory of the compiled files.
+
+    Use the *QSTYLIZER_CACHE_DIR* environment variable if set, otherwise
+    a "qstylizer" directory in the user cache directory.
+
+    """
+    path = os.environ.get("QSTYLIZER_CACHE_DIR")
+    if path:
+        return path
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(root, "qstylizer")
+
+
+def clear(cache_dir=None):
+    """Remove all of the compiled files from the cache directory.
+
+    :param cache_dir: The directory of the compiled files. Defaults to
+        :func:`default_cache_dir`.
+
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith(EXTENSION):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def _read(path):
+    """Return the records of a compiled file or None if it is not valid."""
+    try:
+        with io.open(path, "rb") as fileobj:
+            data = fileobj.read()
+    except (IOError, OSError):
+        return None
+    try:
+        version, records = json.loads(data.decode("utf-8"))
+    except (ValueError, TypeError, RuntimeError):
+        # A file written by another program or damaged on disk is ignored
+        # and replaced. Deeply nested JSON raises a RecursionError.
+        return None
+    if version != FORMAT_VERSION:
+        return None
+    return _validate(records)
+
+
+def _validate(records):
+    """Return the records of a compiled file as tuples or None if invalid.
+
+    JSON does not distinguish tuples from lists, so the paths and records
+    are converted back to the tuples returned by :meth:`to_records
+    <qstylizer.style.StyleRule.to_records>`. Each path must lead to a rule
+    recorded before it, and each rule class must be a StyleRule class.
+
+    """
+    if not isinstance(records, list):
+        return None
+    classes = _rule_class_names()
+    paths = set([()])
+    last_path = []
+    path = ()
+    result = []
+    append = result.append
+    for record in records:
+        if type(record) is not list or len(record) not in (3, 6):
+            return None
+        if record[0] != last_path:
+            last_path = record[0]
+            if type(last_path) is not list:
+                return None
+            path = tuple(last_path)
+            if path not in paths:
+                return None
+        key = record[1]
+        value = record[2]
+        if not isinstance(key, _STRING_TYPES):
+            return None
+        if value is not None and not isinstance(value, _VALUE_TYPES):
+            return None
+        if len(record) == 3:
+            append((path, key, value))
+            continue
+        class_name, name, rank = record[3:]
+        if (
+            class_name not in classes
+            or not isinstance(name, _STRING_TYPES)
+            or type(rank) is not int
+        ):
+            return None
+        paths.add(path + (key,))
+        append((path, key, value, class_name, name, rank))
+    return result
+
+
+def _rule_class_names():
+    """Return the names of the StyleRule class and its subclasses."""
+    names = set()
+    classes = [qstylizer.style.StyleRule]
+    while classes:
+        class_ = classes.pop()
+        names.add(class_.__name__)
+        classes.extend(class_.__subclasses__())
+    return names
+
+
+def _write(path, records):
+    """Write the records to a compiled file atomically.
+
+    Errors are ignored so that a read-only cache directory only disables
+    the cache.
+
+    """
+    directory = os.path.dirname(path)
+    temp_path = None
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        handle, temp_path = tempfile.mkstemp(
+            prefix=".", suffix=EXTENSION + ".tmp", dir=directory
+        )
+        with os.fdopen(handle, "wb") as fileobj:
+            fileobj.write(
+                json.dumps(
+                    [FORMAT_VERSION, records], separators=(",", ":")
+                ).encode("utf-8")
+            )
+        _replace(temp_path, path)
+        temp_path = None
+    except (IOError, OSError):
+        pass
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+def _replace(source, destination):
+    """Rename a file, replacing the destination if it exists."""
+    try:
+        replace = os.replace
+    except AttributeError:
+        # Python 2 only replaces existing files on POSIX systems.
+        replace = os.rename
+    replace(source, destination)
+
+
+def _qstylizer_version():
+    """Return the version of the installed qstylizer distribution.
+
+    Return an empty string if it is not installed.
+
+    """
+    global _version
+    if _version is None:
+        try:
+            import importlib.metadata as metadata
+        except ImportError:
+            metadata = None
+        try:
+            if metadata is not None:
+                _version = metadata.version("qstylizer")
+            else:
+                import pkg_resources
+                _version = pkg_resources.get_distribution(
+                    "qstylizer"
+                ).version
+        except Exception:
+            _version = ""
+    return _version
@@ -98,10 +98,8 @@ PROPERTY_VALUES = {
 class PropDescriptor(qstylizer.descriptor.stylerule.StyleRuleDescriptor):
     """Property descriptor."""
 
-    @property
-    def rule_cls(self):
-        import qstylizer.style
-        return qstylizer.style.PropRule
+    is_prop = True
+    rule_cls_name = "PropRule"
 
 
 class PropParent(qstylizer.descriptor.stylerule.StyleRuleParent):
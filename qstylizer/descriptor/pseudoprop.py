@@ -6,10 +6,7 @@ import qstylizer.descriptor.stylerule
 class PseudoPropDescriptor(qstylizer.descriptor.stylerule.StyleRuleDescriptor):
     """Pseudo-property descriptor."""
 
-    @property
-    def rule_cls(self):
-        import qstylizer.style
-        return qstylizer.style.PseudoPropRule
+    rule_cls_name = "PseudoPropRule"
 
 
 class PseudoPropParent(qstylizer.descriptor.stylerule.StyleRuleParent):
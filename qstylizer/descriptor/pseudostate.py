@@ -6,10 +6,7 @@ import qstylizer.descriptor.stylerule
 class PseudoStateDescriptor(qstylizer.descriptor.stylerule.StyleRuleDescriptor):
     """Pseudo-state descriptor."""
 
-    @property
-    def rule_cls(self):
-        import qstylizer.style
-        return qstylizer.style.PseudoStateRule
+    rule_cls_name = "PseudoStateRule"
 
 
 class PseudoStateParent(qstylizer.descriptor.stylerule.StyleRuleParent):
@@ -6,10 +6,7 @@ import qstylizer.descriptor.stylerule
 class ClassStyleDescriptor(qstylizer.descriptor.stylerule.StyleRuleDescriptor):
     """QClass descriptor."""
 
-    @property
-    def rule_cls(self):
-        import qstylizer.style
-        return qstylizer.style.ClassRule
+    rule_cls_name = "ClassRule"
 
 
 class ClassStyleParent(qstylizer.descriptor.stylerule.StyleRuleParent):
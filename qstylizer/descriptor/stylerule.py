@@ -1,18 +1,31 @@
 # coding: utf-8
 
 import copy
+import collections
 
 
 class StyleRuleDescriptor(object):
     """StyleRule descriptor."""
 
+    #: Whether the descriptor holds a PropRule rather than a StyleRule.
+    is_prop = False
+
+    #: Name of the class in :mod:`qstylizer.style` of the rule it holds.
+    rule_cls_name = "StyleRule"
+
     def __init__(self, name):
         """Initialize the StyleRuleDescriptor instance.
 
+        .. note:: The rule class and the sanitized key are resolved the
+            first time the descriptor is used, as :mod:`qstylizer.style`
+            imports the descriptors before defining the rule classes.
+
         :param name: The attribute name of type string
 
         """
         self.name = name
+        self._key = None
+        self._rule_cls = None
 
     def __get__(self, instance, *args, **kwargs):
         """Get the value from the StyleRule's ordered dict.
@@ -20,18 +33,27 @@ class StyleRuleDescriptor(object):
         If value doesn't exist, create a new StyleRule instance and add it
         to the StyleRule's ordered dict.
 
+        An existing value is returned with a single dict lookup. Properties
+        of a deferred rule block are not in the dict until it is built, so
+        they are found on the slow path with :meth:`StyleRule.get`.
+
         :param instance: The StyleRule instance
 
         """
-        import qstylizer.style
-        assert isinstance(instance, qstylizer.style.StyleRule)
-        if instance.find_child_rule(self.name) is None:
-            new_style = self.rule_cls(
-                name=self.name,
-                parent=instance,
-            )
-            instance.set_child_rule(self.name, new_style)
-        return instance.find_child_rule(self.name)
+        if instance is None:
+            return self
+        key = self._key
+        if key is not None:
+            value = _dict_get(instance, key)
+            if value is not None:
+                return value
+        else:
+            key = self._resolve()[0]
+        value = instance.get(key)
+        if value is None:
+            value = self.rule_cls(name=self.name, parent=instance)
+            instance.set_child_rule(key, value)
+        return value
 
     def __set__(self, instance, value):
         """Set the value in the StyleRule's ordered dict.
@@ -58,11 +80,70 @@ class StyleRuleDescriptor(object):
 
     @property
     def rule_cls(self):
+        rule_cls = self._rule_cls
+        if rule_cls is None:
+            rule_cls = self._resolve()[1]
+        return rule_cls
+
+    def _resolve(self):
+        """Resolve and keep the sanitized key and the rule class.
+
+        Return a tuple of the key and the rule class.
+
+        """
         import qstylizer.style
-        return qstylizer.style.StyleRule
+        self._rule_cls = getattr(qstylizer.style, self.rule_cls_name)
+        self._key = qstylizer.style.StyleRule._sanitize_key(self.name)
+        return self._key, self._rule_cls
+
+
+class StyleRuleParentMeta(type):
+    """StyleRuleParent metaclass.
+
+    Precompute the attribute tables of each class when it is created so that
+    they are shared by all of its instances instead of being gathered again
+    for every new StyleRule.
+
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super(StyleRuleParentMeta, cls).__init__(name, bases, namespace)
+        cls._attributes = cls._collect_attributes()
+        cls._attr_options = frozenset(
+            value.name for value in cls._attributes.values()
+        )
+        cls._rule_options = frozenset(
+            value.name for value in cls._attributes.values()
+            if not value.is_prop
+        )
+
+    def _collect_attributes(cls):
+        """Gather the descriptors of the class and all of its bases.
+
+        Use the tables already computed for the base classes rather than
+        walking the whole hierarchy again.
+
+        """
+        attributes = {}
+        for class_ in cls.__bases__:
+            if not isinstance(class_, StyleRuleParentMeta):
+                continue
+            attributes.update(class_._attributes)
+        descriptor_cls = getattr(cls, "_descriptor_cls", None)
+        if descriptor_cls is not None:
+            attributes.update({
+                key: value for key, value in cls.__dict__.items()
+                if isinstance(value, descriptor_cls)
+            })
+        return attributes
 
 
-class StyleRuleParent(object):
+# Base class created through the metaclass in a way that works with both
+# Python 2 and Python 3 class syntax.
+_StyleRuleParentBase = StyleRuleParentMeta("_StyleRuleParentBase", (object,), {})
+
+
+class StyleRuleParent(_StyleRuleParentBase):
     """StyleRule descriptor.
 
     Contains functions for getting all known attributes of the StyleRule.
@@ -74,25 +155,11 @@ class StyleRuleParent(object):
     def get_attributes(cls):
         """Get all of the settable attributes of the StyleRule.
 
-        Loop through all base classes to gather all known attributes.
         Returns a dictionary with the attribute name as the key and descriptor
-        as the value.
+        as the value. The table is computed once when the class is created.
 
         """
-        attributes = {}
-        for class_ in cls.__bases__:
-            if not issubclass(class_, StyleRuleParent):
-                continue
-            attributes.update({
-                key: value for key, value in class_.__dict__.items()
-                if isinstance(value, class_._descriptor_cls)
-            })
-            attributes.update(class_.get_attributes())
-        attributes.update({
-            key: value for key, value in cls.__dict__.items()
-            if isinstance(value, cls._descriptor_cls)
-        })
-        return attributes
+        return dict(cls._attributes)
 
     @classmethod
     def get_attr_options(cls):
@@ -101,6 +168,7 @@ class StyleRuleParent(object):
         Returns a set of all possible dashcase attribute names.
 
         """
-        return set(
-            [value.name for value in cls.get_attributes().values()]
-        )
+        return set(cls._attr_options)
+
+
+_dict_get = collections.OrderedDict.get
@@ -6,10 +6,7 @@ import qstylizer.descriptor.stylerule
 class SubControlDescriptor(qstylizer.descriptor.stylerule.StyleRuleDescriptor):
     """Subcontrol descriptor."""
 
-    @property
-    def rule_cls(self):
-        import qstylizer.style
-        return qstylizer.style.SubControlRule
+    rule_cls_name = "SubControlRule"
 
 
 class SubControlParent(qstylizer.descriptor.stylerule.StyleRuleParent):
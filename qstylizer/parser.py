@@ -1,29 +1,557 @@
 # coding: utf-8
 
-import tinycss2
+import io
+import re
+import copy
+import mmap
+import sys
+import codecs
+import itertools
 
+import qstylizer.cache
 import qstylizer.style
 
 
-def parse(stylesheet):
+#: Number of characters read from a file object at a time.
+CHUNK_SIZE = 64 * 1024
+
+# Property names in the body of a rule block deferred in lazy mode.
+_DECLARATION_NAMES = re.compile(r"([-\w]+)\s*:")
+_COMMENTS = re.compile(r"/\*.*?(?:\*/|\Z)", re.S)
+
+# Selectors made of these characters are serialized by tinycss2 as they are.
+_PLAIN_SELECTOR = re.compile(r"[\s\w\-:#.,>+~*!=\[\]()]*\Z")
+
+# Records of parsed stylesheet strings, set by enable_cache.
+_cache = None
+
+
+def parse(stylesheet, lazy=False):
     """Parse a stylesheet using tinycss2 and return a StyleSheet instance.
 
+    The rule of each block is found or created once from its selector and
+    all of the block's declarations are then added to it in bulk.
+
+    In lazy mode only the selectors are parsed up front. The declarations
+    of each rule block are kept as source text and only parsed when the
+    rule is looked up by one of its property names, iterated or modified.
+    Rule blocks which were never parsed are output from their source text.
+
+    .. code-block:: python
+
+        >>> css = qstylizer.parser.parse(stylesheet, lazy=True)
+        >>> css.QTabBar.color.value  # Only the QTabBar block is parsed
+        'red'
+
     :param stylesheet: A string of an existing stylesheet.
+    :param lazy: Defer parsing the declarations of each rule block.
+
+    """
+    if lazy:
+        return _build_lazy(_iter_blocks([stylesheet]))
+
+    cache = _cache
+    if cache is None:
+        return _build(_parse_blocks(stylesheet))
+    css = cache.get(stylesheet)
+    if css is None:
+        css = _build(_parse_blocks(stylesheet))
+        # Format the rule blocks once so that the clones share them.
+        css.toString()
+        cache.set(stylesheet, css)
+    return copy.deepcopy(css)
+
+
+def enable_cache(maxsize=128, maxbytes=16 * 1024 * 1024):
+    """Cache the results of :func:`parse` for identical stylesheet strings.
+
+    A cache hit returns a copy-on-write clone of the cached StyleSheet,
+    without tokenizing the stylesheet again. The clones can be modified
+    freely without affecting the cached StyleSheet. Lazy parsing is never
+    cached. Calling this function again replaces the cache.
+
+    .. code-block:: python
+
+        >>> qstylizer.parser.enable_cache(maxsize=64)
+        >>> css = qstylizer.parser.parse(stylesheet)
+        >>> css = qstylizer.parser.parse(stylesheet)
+        >>> qstylizer.parser.cache_info().hits
+        1
+
+    :param maxsize: The maximum number of cached stylesheets. None means
+        unbounded.
+    :param maxbytes: The maximum total size in bytes of the cached
+        StyleSheets, estimated from their rules and properties when they
+        are added to the cache. None means unbounded.
+
+    """
+    global _cache
+    _cache = qstylizer.cache.LRUCache(
+        maxsize=maxsize, maxbytes=maxbytes, sizeof=_sizeof
+    )
+
+
+def disable_cache():
+    """Disable and clear the cache of :func:`enable_cache`."""
+    global _cache
+    _cache = None
+
+
+def cache_info():
+    """Return the :class:`qstylizer.cache.CacheInfo` of the parse cache.
+
+    Return None if the cache is disabled.
+
+    """
+    cache = _cache
+    if cache is None:
+        return None
+    return cache.info()
+
+
+def _sizeof(stylesheet, css):
+    """Return an estimate of the size of a cached StyleSheet.
+
+    The size is the size of the stylesheet string plus the size of each
+    rule, its attributes and cached strings, and of each property and its
+    value. Names and values shared with other StyleSheets are counted too.
+
+    """
+    getsizeof = sys.getsizeof
+    size = getsizeof(stylesheet)
+    for rule in itertools.chain([css], css._iter_rules()):
+        size += getsizeof(rule) + getsizeof(rule.__dict__)
+        for string in (rule._selector, rule._block):
+            if string is not None:
+                size += getsizeof(string)
+        for child in rule.values():
+            if isinstance(child, qstylizer.style.PropRule):
+                size += getsizeof(child) + getsizeof(child._value)
+    return size
+
+
+def parse_file(
+    path_or_fileobj, encoding="utf-8", chunk_size=CHUNK_SIZE, lazy=False
+):
+    """Parse a stylesheet file and return a StyleSheet instance.
+
+    The file is read in chunks and the StyleSheet is built one rule block at
+    a time, so the whole file is never held in memory as a single string.
+
+    :param path_or_fileobj: A path or a file object opened in text or
+        binary mode.
+    :param encoding: The encoding of the file if it is read as bytes.
+    :param chunk_size: The number of characters to read at a time.
+    :param lazy: Defer parsing the declarations of each rule block as
+        described in :func:`parse`.
 
     """
+    build = _build_lazy if lazy else _build_parsed
+    if hasattr(path_or_fileobj, "read"):
+        return build(
+            _iter_blocks(_iter_text(path_or_fileobj, encoding, chunk_size))
+        )
+    with io.open(path_or_fileobj, "r", encoding=encoding) as fileobj:
+        return build(_iter_blocks(_iter_text(fileobj, encoding, chunk_size)))
+
+
+def parse_mmap(path, encoding="utf-8", lazy=False):
+    """Parse a stylesheet file by memory-mapping it.
+
+    The rule boundaries are found on the mapped bytes and each rule block is
+    decoded on its own, so the file is never read into a single string.
+    The encoding must be ASCII compatible, such as UTF-8 or Latin-1.
+
+    :param path: The path of the stylesheet file.
+    :param encoding: The encoding of the file.
+    :param lazy: Defer parsing the declarations of each rule block as
+        described in :func:`parse`.
+
+    """
+    build = _build_lazy if lazy else _build_parsed
+    with io.open(path, "rb") as fileobj:
+        try:
+            mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return qstylizer.style.StyleSheet()
+        try:
+            return build(_iter_mapped_blocks(mapped, encoding))
+        finally:
+            mapped.close()
+
+
+def parse_many(paths, workers=None, encoding="utf-8"):
+    """Parse several stylesheet files in parallel and merge them.
+
+    Each file is parsed in a process pool, which only sends back the
+    (selector, declarations) tuples of its rule blocks. The StyleSheet is
+    then built in this process from the rule blocks of each file in the
+    order of *paths*, the same as parsing the files joined together.
+
+    .. code-block:: python
+
+        >>> css = qstylizer.parser.parse_many(
+        ...     ["base.qss", "plugin.qss"], workers=4
+        ... )
+
+    :param paths: The paths of the stylesheet files.
+    :param workers: The number of processes to use. Defaults to the number
+        of processors. The files are parsed in this process if it is 1.
+    :param encoding: The encoding of the files.
+
+    """
+    paths = list(paths)
+    arguments = [(path, encoding) for path in paths]
+    if workers == 1 or len(paths) < 2:
+        return _merge(map(_parse_path, arguments))
+
+    try:
+        import concurrent.futures
+    except ImportError:
+        # The futures backport is not installed.
+        return parse_many(paths, workers=1, encoding=encoding)
+
+    import multiprocessing
+    workers = workers or multiprocessing.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # Send the files in batches to limit the round trips.
+        chunksize = max(1, len(paths) // (workers * 4))
+        return _merge(
+            executor.map(_parse_path, arguments, chunksize=chunksize)
+        )
+
+
+def _merge(results):
+    """Build a StyleSheet from lists of rule blocks in order.
+
+    :param results: Iterable of lists of (selector, declarations) tuples.
+
+    """
+    return _build(block for blocks in results for block in blocks)
+
+
+def _parse_path(arguments):
+    """Parse a stylesheet file and return a list of its rule blocks.
+
+    :param arguments: Tuple of (path, encoding).
+
+    """
+    path, encoding = arguments
+    with io.open(path, "r", encoding=encoding) as fileobj:
+        return list(_parse_blocks(fileobj.read()))
+
+
+def iter_parse(fileobj, encoding="utf-8", chunk_size=CHUNK_SIZE):
+    """Parse a stylesheet from a file object one rule block at a time.
+
+    Yield a (selector, declarations) tuple for each rule block, where
+    declarations is a list of (property, value) tuples. The input is split
+    at the end of each top-level block, so peak memory is proportional to
+    the largest rule rather than the whole file.
+
+    .. code-block:: python
+
+        >>> with open("style.qss") as fileobj:
+        ...     for selector, declarations in iter_parse(fileobj):
+        ...         print(selector, declarations)
+        QCheckBox::indicator [('border', 'none')]
+
+    :param fileobj: A file object opened in text or binary mode.
+    :param encoding: The encoding of the file if it is read as bytes.
+    :param chunk_size: The number of characters to read at a time.
+
+    """
+    return _iter_parsed_blocks(
+        _iter_blocks(_iter_text(fileobj, encoding, chunk_size))
+    )
+
+
+def _iter_parsed_blocks(blocks):
+    """Parse (text, opening) block tuples and yield their rule blocks."""
+    for block, _ in blocks:
+        for result in _parse_blocks(block):
+            yield result
+
+
+def _build(blocks):
+    """Build a StyleSheet from (selector, declarations) tuples."""
+    css = qstylizer.style.StyleSheet()
+    for selector, declarations in blocks:
+        if declarations:
+            css.find_or_create_child_rule(selector)._set_props(declarations)
+    return css
+
+
+def _build_parsed(blocks):
+    """Build a StyleSheet from (text, opening) block tuples."""
+    return _build(_iter_parsed_blocks(blocks))
+
+
+def _build_lazy(blocks):
+    """Build a StyleSheet deferring the declarations of each rule block.
+
+    Text which is not a single rule block is parsed right away.
+
+    :param blocks: Iterable of (text, opening) tuples.
+
+    """
+    css = qstylizer.style.StyleSheet()
+    for block, opening in blocks:
+        result = _split_block(block, opening)
+        if result is None:
+            for selector, declarations in _parse_blocks(block):
+                if declarations:
+                    css.find_or_create_child_rule(selector)._set_props(
+                        declarations
+                    )
+            continue
+        selector, body, names = result
+        if names:
+            css.find_or_create_child_rule(selector)._defer_props(body, names)
+    return css
+
+
+def _split_block(block, opening):
+    """Split a rule block into its selector, body and property names.
+
+    Only the selector is tokenized, unless it is made of plain characters
+    only. The property names are found with a regular expression which can
+    match more names than are declared but never fewer. Return None if the
+    text is not a single rule block.
+
+    :param block: The text of the rule block.
+    :param opening: The index of the opening brace in the text.
+
+    """
+    if opening < 0:
+        return None
+    prelude = block[:opening]
+    if _PLAIN_SELECTOR.match(prelude):
+        selector = prelude.strip()
+    else:
+        import tinycss2
+        nodes = tinycss2.parse_stylesheet(
+            prelude + "{}", skip_comments=True, skip_whitespace=True
+        )
+        if len(nodes) != 1 or nodes[0].type != "qualified-rule":
+            return None
+        selector = tinycss2.serialize(nodes[0].prelude).strip()
+    body = block[opening + 1:-1]
+    text = _COMMENTS.sub("", body) if "/*" in body else body
+    return selector, body, _DECLARATION_NAMES.findall(text)
+
+
+def _parse_blocks(stylesheet):
+    """Parse a string with tinycss2 and yield its rule blocks.
+
+    :param stylesheet: A string of one or more rule blocks.
+
+    """
+    import tinycss2
     parsed_stylesheet = tinycss2.parse_stylesheet(
         stylesheet, skip_comments=True, skip_whitespace=True
     )
-    css = qstylizer.style.StyleSheet()
     for node in parsed_stylesheet:
         if node.type == "error":
             raise ValueError("Cannot parse Stylesheet: " + node.message)
         selector = tinycss2.serialize(node.prelude).strip()
-        declaration_list = tinycss2.parse_declaration_list(
-            node.content, skip_comments=True, skip_whitespace=True
+        yield selector, _parse_declarations(node.content)
+
+
+def _parse_declarations(content):
+    """Parse the content of a rule block into (property, value) tuples.
+
+    The values are interned in :data:`qstylizer.style.VALUES`.
+
+    :param content: A string or the tinycss2 tokens of the content.
+
+    """
+    import tinycss2
+    declaration_list = tinycss2.parse_declaration_list(
+        content, skip_comments=True, skip_whitespace=True
+    )
+    intern = qstylizer.style.VALUES.intern
+    return [
+        (
+            declaration.name.strip(),
+            intern(tinycss2.serialize(declaration.value).strip())
         )
-        for declaration in declaration_list:
-            if declaration.type == "declaration":
-                prop = declaration.name.strip()
-                css[selector][prop] = tinycss2.serialize(declaration.value).strip()
-    return css
+        for declaration in declaration_list
+        if declaration.type == "declaration"
+    ]
+
+
+def _iter_text(fileobj, encoding, chunk_size):
+    """Read a file object in chunks and yield them as text.
+
+    Bytes are decoded incrementally so that multibyte characters split
+    between two chunks are decoded correctly.
+
+    """
+    decoder = None
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        chunk = decoder.decode(b"", final=True)
+        if chunk:
+            yield chunk
+
+
+def _iter_blocks(chunks):
+    """Split chunks of text at the end of each top-level block.
+
+    Yield a (text, opening) tuple for each block, where opening is the index
+    of the block's opening brace in the text. Any text between two blocks
+    is yielded with the block that follows it. Text after the last block is
+    yielded with an opening of -1.
+
+    :param chunks: Iterable of strings.
+
+    """
+    scanner = _BlockScanner(u"")
+    buffer = ""
+    start = 0
+    for chunk in chunks:
+        buffer = buffer[start:] + chunk
+        scanner.shift(start)
+        start = 0
+        for opening, end in scanner.scan(buffer):
+            yield buffer[start:end], opening - start
+            start = end
+    buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer, -1
+
+
+def _iter_mapped_blocks(mapped, encoding):
+    """Split a memory-mapped file at the end of each top-level block.
+
+    The rule boundaries are found on the raw bytes and only the slice of
+    each block is decoded. The encoding must be ASCII compatible.
+
+    Yield (text, opening) tuples like :func:`_iter_blocks`.
+
+    :param mapped: A mmap object or a bytes string.
+    :param encoding: The encoding of the file.
+
+    """
+    start = 0
+    for opening, end in _BlockScanner(b"").scan(mapped):
+        prelude = mapped[start:opening].decode(encoding)
+        yield prelude + mapped[opening:end].decode(encoding), len(prelude)
+        start = end
+    block = mapped[start:len(mapped)].decode(encoding)
+    if block.strip():
+        yield block, -1
+
+
+class _BlockScanner(object):
+    """Scanner finding the end of top-level rule blocks in a buffer.
+
+    Braces within comments, strings and escapes are skipped. The scanner
+    keeps its state between calls to :meth:`scan` so that a buffer can be
+    scanned again after more input is appended to it.
+
+    """
+
+    def __init__(self, empty):
+        """Initialize the _BlockScanner instance.
+
+        :param empty: An empty str or bytes matching the type of the buffers
+            to scan.
+
+        """
+        def convert(string):
+            if isinstance(empty, bytes):
+                return string.encode("ascii")
+            return string
+
+        self._tokens = re.compile(convert(r"""/\*|["'{}\\]"""))
+        self._string_ends = {
+            convert("\""): re.compile(convert(r"""["\\\n]""")),
+            convert("'"): re.compile(convert(r"""['\\\n]""")),
+        }
+        self._comment_end = re.compile(convert(r"\*/"))
+        self._comment = convert("/*")
+        self._escape = convert("\\")
+        self._open = convert("{")
+        self._slash = convert("/")
+        self.position = 0
+        self.opening = -1
+        self.depth = 0
+        self.state = None
+
+    def shift(self, offset):
+        """Move the positions back after text is removed from the buffer.
+
+        :param offset: The number of characters removed from the start.
+
+        """
+        self.position -= offset
+        self.opening -= offset
+
+    def scan(self, buffer):
+        """Yield the opening brace and end position of each top-level block.
+
+        Scanning starts at :attr:`position` and stops at the end of the
+        buffer or where more input is needed to continue.
+
+        :param buffer: A str, bytes or mmap object.
+
+        """
+        position = self.position
+        length = len(buffer)
+        while True:
+            if self.state == self._comment:
+                match = self._comment_end.search(buffer, position)
+                if match is None:
+                    # Keep the last character in case it starts "*/".
+                    position = max(position, length - 1)
+                    break
+                position = match.end()
+                self.state = None
+                continue
+
+            if self.state is not None:
+                match = self._string_ends[self.state].search(buffer, position)
+            else:
+                match = self._tokens.search(buffer, position)
+            if match is None:
+                position = length
+                if (
+                    self.state is None and
+                    buffer[length - 1:length] == self._slash
+                ):
+                    position -= 1
+                break
+
+            token = match.group()
+            position = match.end()
+            if token == self._escape:
+                # The escaped character is needed to move past it.
+                if position == length:
+                    position = match.start()
+                    break
+                position += 1
+            elif self.state is not None:
+                self.state = None
+            elif token == self._open:
+                if not self.depth:
+                    self.opening = match.start()
+                self.depth += 1
+            elif token in self._string_ends or token == self._comment:
+                self.state = token
+            elif self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    self.position = position
+                    yield self.opening, position
+        self.position = position
@@ -0,0 +1,231 @@
+# coding: utf-8
+
+import collections
+
+import qstylizer.style
+
+
+PropChange = collections.namedtuple(
+    "PropChange", ["selector", "prop", "old", "new"]
+)
+
+
+class Patch(object):
+    """The differences between two StyleSheet trees.
+
+    Lists the rules and property values that were added, removed and changed
+    and can apply those changes in place to another StyleSheet.
+
+    .. code-block:: python
+
+        >>> patch = qstylizer.diff(old, new)
+        >>> patch.selectors
+        ['QCheckBox::indicator', 'QFrame']
+        >>> patch.apply(old)
+
+    """
+
+    def __init__(self):
+        """Initialize the Patch instance."""
+        self.added_rules = []
+        self.removed_rules = []
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self._operations = []
+
+    @property
+    def selectors(self):
+        """Return the selectors of all of the rules affected by the patch."""
+        selectors = []
+        for selector in (
+            self.added_rules + self.removed_rules +
+            [change.selector for change in
+             self.added + self.removed + self.changed]
+        ):
+            if selector not in selectors:
+                selectors.append(selector)
+        return selectors
+
+    def apply(self, stylesheet):
+        """Apply the changes in place.
+
+        :param stylesheet: The StyleSheet to modify
+
+        """
+        for operation, path, key, value in self._operations:
+            rule = _find_or_create_path(stylesheet, path)
+            if operation == "set":
+                child = rule.get(key)
+                if isinstance(child, qstylizer.style.StyleRule):
+                    child.setValue(value)
+                else:
+                    rule.set_child_rule(key, value)
+            elif operation == "unset":
+                child = rule.get(key)
+                if isinstance(child, qstylizer.style.StyleRule):
+                    child.setValue(None)
+                elif child is not None:
+                    del rule[key]
+            elif operation == "remove":
+                if rule.get(key) is not None:
+                    del rule[key]
+
+    def _record(self, operation, path, key=None, value=None):
+        self._operations.append((operation, path, key, value))
+
+    def __bool__(self):
+        return bool(self._operations)
+
+    __nonzero__ = __bool__
+
+    def __len__(self):
+        return len(self._operations)
+
+    def __repr__(self):
+        return (
+            "<Patch added_rules={0} removed_rules={1} added={2} "
+            "removed={3} changed={4} />".format(
+                len(self.added_rules), len(self.removed_rules),
+                len(self.added), len(self.removed), len(self.changed)
+            )
+        )
+
+
+def diff(old, new):
+    """Return a :class:`Patch` describing how to turn old into new.
+
+    Both trees are walked together. Rules are matched by key and rule
+    class and property values are compared as they would be output by
+    toString. Subtrees with equal content hashes are skipped.
+
+    :param old: The original StyleSheet
+    :param new: The updated StyleSheet
+
+    """
+    patch = Patch()
+    _diff_rule(patch, old, new, ())
+    return patch
+
+
+def _properties(rule):
+    """Return an ordered dict of the values output in the rule block."""
+    return collections.OrderedDict(
+        (key, child.value) for key, child in rule.items()
+        if child.value is not None
+    )
+
+
+def _child_rules(rule):
+    """Return an ordered dict of the child rules that are not PropRules."""
+    return collections.OrderedDict(
+        (key, child) for key, child in rule.items()
+        if isinstance(child, qstylizer.style.StyleRule)
+    )
+
+
+def _is_unchanged(old, new):
+    """Determine if two rules can be skipped without diffing them.
+
+    Subtrees with the same content digest are skipped without walking them.
+    The digests are cached on the rules, so diffing against the same sheet
+    again only walks the subtrees which changed since.
+
+    """
+    return old is new or old.content_hash() == new.content_hash()
+
+
+def _is_changed(old_value, new_value):
+    """Determine if a property value changed.
+
+    Values of different types are output differently even if they compare
+    equal, like 1 and True.
+
+    """
+    return type(old_value) is not type(new_value) or old_value != new_value
+
+
+def _diff_rule(patch, old, new, path):
+    """Record the differences between two matching rules.
+
+    :param patch: The Patch to record the differences in
+    :param old: The original rule
+    :param new: The updated rule
+    :param path: Tuple of (key, class, name) leading to the rules
+
+    """
+    if _is_unchanged(old, new):
+        return
+
+    # Child rules are handled first so that the values of pseudo-properties
+    # are set on the rules rather than replaced by them.
+    old_rules = _child_rules(old)
+    new_rules = _child_rules(new)
+    for key, old_child in old_rules.items():
+        new_child = new_rules.get(key)
+        if new_child is None or type(new_child) is not type(old_child):
+            _remove_rule(patch, old_child)
+            patch._record("remove", path, key)
+    for key, new_child in new_rules.items():
+        child_path = path + ((key, type(new_child), new_child._name),)
+        old_child = old_rules.get(key)
+        if old_child is None or type(new_child) is not type(old_child):
+            _add_rule(patch, new_child, child_path)
+        else:
+            _diff_rule(patch, old_child, new_child, child_path)
+
+    selector = new.selector
+    old_properties = _properties(old)
+    new_properties = _properties(new)
+    for key, value in old_properties.items():
+        if key not in new_properties:
+            patch.removed.append(PropChange(selector, key, value, None))
+            patch._record("unset", path, key)
+    for key, value in new_properties.items():
+        if key not in old_properties:
+            patch.added.append(PropChange(selector, key, None, value))
+            patch._record("set", path, key, value)
+        elif _is_changed(old_properties[key], value):
+            patch.changed.append(
+                PropChange(selector, key, old_properties[key], value)
+            )
+            patch._record("set", path, key, value)
+
+
+def _add_rule(patch, rule, path):
+    """Record a rule only found in the new tree along with its subtree."""
+    selector = rule.selector
+    patch.added_rules.append(selector)
+    patch._record("create", path)
+    for key, child in _child_rules(rule).items():
+        _add_rule(patch, child, path + ((key, type(child), child._name),))
+    for key, value in _properties(rule).items():
+        patch.added.append(PropChange(selector, key, None, value))
+        patch._record("set", path, key, value)
+
+
+def _remove_rule(patch, rule):
+    """Record a rule only found in the old tree along with its subtree."""
+    selector = rule.selector
+    patch.removed_rules.append(selector)
+    for key, value in _properties(rule).items():
+        patch.removed.append(PropChange(selector, key, value, None))
+    for child in _child_rules(rule).values():
+        _remove_rule(patch, child)
+
+
+def _find_or_create_path(stylesheet, path):
+    """Return the rule at the end of path, creating missing rules.
+
+    :param stylesheet: The root rule
+    :param path: Tuple of (key, class, name)
+
+    """
+    rule = stylesheet
+    for key, class_, name in path:
+        child = rule.get(key)
+        if type(child) is not class_:
+            child = class_(name=name, parent=rule)
+            rule.set_child_rule(key, child)
+        rule = child
+    return rule
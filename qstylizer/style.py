@@ -1,10 +1,10 @@
 # coding: utf-8
 
-import re
 import copy
+import itertools
 import collections
-import inflection
 
+import qstylizer.cache
 import qstylizer.descriptor.prop
 import qstylizer.descriptor.subcontrol
 import qstylizer.descriptor.pseudostate
@@ -13,11 +13,78 @@ import qstylizer.descriptor.qclass
 import qstylizer.descriptor.stylerule
 
 
-QPROPERTIES = qstylizer.descriptor.prop.PropParent.get_attr_options()
-QSUBCONTROLS = qstylizer.descriptor.subcontrol.SubControlParent.get_attr_options()
-QPSEUDOSTATES = qstylizer.descriptor.pseudostate.PseudoStateParent.get_attr_options()
-QPSEUDOPROPS = qstylizer.descriptor.pseudoprop.PseudoPropParent.get_attr_options()
-QCLASSES = qstylizer.descriptor.qclass.ClassStyleParent.get_attr_options()
+# Frozen name tables computed once by the metaclass of each parent class.
+QPROPERTIES = qstylizer.descriptor.prop.PropParent._attr_options
+QSUBCONTROLS = qstylizer.descriptor.subcontrol.SubControlParent._attr_options
+QPSEUDOSTATES = qstylizer.descriptor.pseudostate.PseudoStateParent._attr_options
+QPSEUDOPROPS = qstylizer.descriptor.pseudoprop.PseudoPropParent._attr_options
+QCLASSES = qstylizer.descriptor.qclass.ClassStyleParent._attr_options
+
+#: Cache mapping raw keys to the keys sanitized by StyleRule._sanitize_key.
+SANITIZED_KEYS = qstylizer.cache.LRUCache(maxsize=4096)
+
+#: Cache mapping raw keys to the keys sanitized by StyleRuleList._sanitize_key.
+SANITIZED_LIST_KEYS = qstylizer.cache.LRUCache(maxsize=1024)
+
+#: Table sharing the sanitized names of the rules and properties. Its total
+#: counts every sanitized key, including the ones memoized in the caches.
+NAMES = qstylizer.cache.InternTable(
+    memos=[SANITIZED_KEYS, SANITIZED_LIST_KEYS]
+)
+
+#: Table sharing the property values read by the parser.
+VALUES = qstylizer.cache.InternTable()
+
+#: Cache mapping dashcase option names to descriptor attribute names.
+ATTRIBUTE_NAMES = qstylizer.cache.LRUCache(maxsize=1024)
+
+#: Cache mapping the rule names missing from the dispatch table to the
+#: StyleRule subclasses returned by rule_class.
+RULE_CLASSES = qstylizer.cache.LRUCache(maxsize=4096)
+
+#: Cache mapping selectors to their tokens from tokenize_selector.
+SELECTOR_TOKENS = qstylizer.cache.LRUCache(maxsize=4096)
+
+#: A component of a selector returned by tokenize_selector.
+SelectorToken = collections.namedtuple("SelectorToken", ["kind", "text"])
+
+# Global counter giving each indexed rule its position in creation order.
+_rule_order = itertools.count()
+
+# Attributes of a StyleRule which are not deep copied to its clones.
+_SHARED_STATE = frozenset([
+    "_selector", "_block", "_hash", "_rule_count", "_name", "_order",
+    "_deferred", "_snapshot", "_parent", "_rule_index"
+])
+
+#: A property value which differs between the StyleRules given to merge.
+MergeConflict = collections.namedtuple(
+    "MergeConflict", ["selector", "prop", "old", "new"]
+)
+
+#: Policies accepted by StyleRule.merge.
+MERGE_POLICIES = ("override", "keep", "error")
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _STRING_TYPES = (str,)
+
+
+def clear_caches():
+    """Clear all of the key caches and intern tables and reset their counters.
+
+    Names and values interned before are no longer shared with the ones
+    interned after.
+
+    """
+    SANITIZED_KEYS.clear()
+    SANITIZED_LIST_KEYS.clear()
+    ATTRIBUTE_NAMES.clear()
+    SELECTOR_TOKENS.clear()
+    RULE_CLASSES.clear()
+    NAMES.clear()
+    VALUES.clear()
 
 
 class StyleRule(
@@ -67,6 +134,19 @@ class StyleRule(
     """
     _split_regex = r"""\*|\[[A-Za-z0-9='"_:]+\]|\W*\w*"""
 
+    # Position in the root rule index, set when the rule is added to a tree.
+    _order = 0
+
+    # Declarations of a lazily parsed rule block which are not built yet,
+    # as a tuple of (source text, property keys, number of children). The
+    # source text is a tuple of (key, value) children in copy-on-write
+    # clones, see __deepcopy__.
+    _deferred = None
+
+    # Tuple of the (key, value) children and the set of property keys,
+    # shared with the copy-on-write clones made until the rule changes.
+    _snapshot = None
+
     @classmethod
     def split_selector(cls, selector):
         """Split the selector based on the _split_regex.
@@ -80,14 +160,16 @@ class StyleRule(
         :param name: String name
 
         """
-        selector = selector.replace("-", "_")
-        return re.findall(cls._split_regex, selector)[:-1]
+        return [token.text for token in tokenize_selector(selector)]
 
     def __init__(self, name=None, value=None, parent=None):
         """Initialize the StyleRule dictionary.
 
         .. note:: All public variables will be put into ordered dictionary.
 
+        .. note:: The attribute tables (*_attributes* and *_attr_options*)
+            are computed once per class and shared by all instances.
+
         :param name: The name of the StyleRule
         :param value: The property value
         :param parent:  The parent StyleRule
@@ -95,32 +177,25 @@ class StyleRule(
         """
         super(StyleRule, self).__init__()
 
+        self._selector = None
+        self._block = None
+        self._hash = None
+        self._rule_count = 0
         self._name = self._sanitize_key(name) if name else None
         self._parent = parent
-        self._attributes = self.get_attributes()
-        self._attr_options = self.get_attr_options()
         self._value = self._sanitize_value(value)
-        self._child_rules = collections.OrderedDict()
+        self._rule_index = None
 
     @staticmethod
     def _sanitize_key(key):
         """Strip the key of colons and replace underscores with dashes.
 
+        The result is memoized in :data:`SANITIZED_KEYS`.
+
         :param key: A string variable
 
         """
-        key = str(key)
-        if (
-            key and key[0] not in ["Q", "#", "[", " "] and
-            key != inflection.camelize(key) and
-            not key.startswith("qproperty-")
-        ):
-            key = inflection.underscore(key)
-
-        if key and key[0] != "[":
-            key = key.replace("not_", "!").replace(":", "").replace("_", "-")
-
-        return key
+        return SANITIZED_KEYS.get_or_set(str(key), _sanitize_key)
 
     @staticmethod
     def _sanitize_value(value):
@@ -179,23 +254,22 @@ class StyleRule(
     def create_child_rules(self, selector):
         """Create child rules from selector string.
 
-        Split the selector into individual components based on the _split_regex
-        and recursively build the StyleRule hierarchy looping through
-        the components.
+        Split the selector into tokens with :func:`tokenize_selector` and
+        walk down the StyleRule hierarchy, finding or creating a rule for
+        each token.
 
-        If selector is "QClass::subcontrol:pseudostate",
-        curr_name is "QClass" and remaining is "::subcontrol:pseudostate"
+        If selector is "QClass::subcontrol:pseudostate", the rules are
+        "QClass", "::subcontrol" and ":pseudostate".
 
-        :param name: String to split
+        :param selector: String to split
 
         """
-        curr_name = self.split_selector(selector)[0]
-        remaining = selector.split(curr_name, 1)[-1].replace("-", "_")
-        rule = self.find_child_rule(curr_name)
-        if rule is None:
-            rule = self.create_child_rule(curr_name)
-        if remaining and remaining != curr_name:
-            return rule.find_or_create_child_rule(remaining)
+        rule = self
+        for token in tokenize_selector(selector):
+            child = rule.find_child_rule(token.text)
+            if child is None:
+                child = rule.create_child_rule(token.text)
+            rule = child
         return rule
 
     def create_child_rule(self, name):
@@ -215,35 +289,154 @@ class StyleRule(
     def set_child_rule(self, key, value, **kwargs):
         """Set rule in ordered dictionary."""
         key = self._sanitize_key(key)
-        if not isinstance(value, StyleRule):
+        if not isinstance(value, (StyleRule, PropRule)):
             value = self._sanitize_value(value)
             value = PropRule(name=key, value=value, parent=self)
+        is_rule = not isinstance(value, PropRule)
+        if self._deferred is not None and (
+            not is_rule or key in self._deferred[1]
+        ):
+            self._materialize()
+        branching = is_rule and self._is_leaf_scoped()
+        existing = self.get(key)
+        if existing is not None:
+            self._rule_count -= not isinstance(existing, PropRule)
+            if existing is not value:
+                self._remove_child_rule(existing)
+        self._rule_count += is_rule
         self._add_child_rule(value)
-        return super(StyleRule, self).__setitem__(key, value, **kwargs)
+        result = super(StyleRule, self).__setitem__(key, value, **kwargs)
+        self._mark_dirty()
+        if branching:
+            self._invalidate_selector()
+        return result
+
+    def _root(self):
+        """Return the top most ancestor of the StyleRule."""
+        rule = self
+        while rule._parent is not None:
+            rule = rule._parent
+        return rule
 
     def _add_child_rule(self, rule):
-        """Add a rule to the _child_rules dictionary.
+        """Add a rule and its descendants to the root rule index.
+
+        The root StyleRule (usually the StyleSheet) owns a single ordered
+        index of all the rules in the tree, in the order they were added.
+        PropRules are not indexed as they are output by their parent.
 
         :param rule: A StyleRule object.
 
         """
-        if rule.selector not in self._child_rules:
-            self._child_rules[rule.selector] = rule
-        if self._parent is not None:
-            self._parent._add_child_rule(rule)
+        if not isinstance(rule, StyleRule):
+            return
+        root = self._root()
+        if root._rule_index is None:
+            root._rule_index = collections.OrderedDict()
+        index = root._rule_index
+        for descendant in [rule] + list(rule._iter_rules()):
+            if id(descendant) not in index:
+                index[id(descendant)] = descendant
+                descendant._order = next(_rule_order)
+        rule._rule_index = None
+
+    def _remove_child_rule(self, rule):
+        """Remove a rule and its descendants from the root rule index.
+
+        :param rule: A StyleRule object.
+
+        """
+        if not isinstance(rule, StyleRule):
+            return
+        index = self._root()._rule_index
+        if index is None:
+            return
+        rules = [rule]
+        while rules:
+            descendant = rules.pop()
+            index.pop(id(descendant), None)
+            rules.extend(
+                child for child in _dict_values(descendant)
+                if not isinstance(child, PropRule)
+            )
+
+    def _iter_rules(self):
+        """Iterate over all descendant rules in the order they were added.
+
+        The root rule reads its index directly. Other rules walk their
+        subtree and sort it by index position.
+
+        """
+        if self._parent is None and self._rule_index is not None:
+            return iter(list(self._rule_index.values()))
+        rules = []
+        stack = [self]
+        while stack:
+            rule = stack.pop()
+            for child in _dict_values(rule):
+                if not isinstance(child, PropRule):
+                    rules.append(child)
+                    stack.append(child)
+        rules.sort(key=lambda rule: rule._order)
+        return iter(rules)
 
     @property
     def selector(self):
         """Get the selector.
 
+        The selector is cached and only recomputed after the parent, the
+        name or the leaf status of the rule or one of its ancestors changed.
+
         Example::
 
             Object::subcontrol:pseudostate
 
         """
-        if self._parent is None:
-            return self.name if self.name else ""
-        return self._parent.selector + self.scope_operator + self.name
+        selector = self._selector
+        if selector is None:
+            if self._parent is None:
+                selector = self.name if self.name else ""
+            else:
+                selector = (
+                    self._parent.selector + self.scope_operator + self.name
+                )
+            self._selector = selector
+        return selector
+
+    def _invalidate_selector(self):
+        """Reset the cached selector of the rule and all of its descendants.
+
+        The cached rule blocks contain the selector so they are reset too.
+        A descendant can only have a cached selector if all of its ancestors
+        have one, so the walk stops at rules which are already reset.
+
+        """
+        rules = [self]
+        while rules:
+            rule = rules.pop()
+            if rule.__dict__.get("_selector") is None:
+                continue
+            rule.__dict__["_selector"] = None
+            rule.__dict__["_block"] = None
+            rules.extend(
+                child for child in _dict_values(rule)
+                if isinstance(child, StyleRule)
+            )
+
+    def _is_leaf_scoped(self):
+        """Determine if the scope operator depends on the leaf status.
+
+        Only rules using the default scope operator below the top level
+        switch between ":" and "::" when they gain or lose child rules.
+        Return True if the rule is currently such a leaf.
+
+        """
+        return (
+            not self._rule_count and
+            self._parent is not None and
+            type(self).scope_operator is StyleRule.scope_operator and
+            not self.is_top_level()
+        )
 
     @property
     def name(self):
@@ -285,13 +478,11 @@ class StyleRule(
     def is_leaf(self):
         """Determine if StyleRule is a leaf.
 
-        StyleRule is a leaf its child rules dictionary contains only PropRules.
+        StyleRule is a leaf if its ordered dict contains only PropRules.
+        The number of other rules is counted as they are added and deleted.
 
         """
-        for rule in self._child_rules.values():
-            if not isinstance(rule, PropRule):
-                return False
-        return True
+        return not self._rule_count
 
     def is_top_level(self):
         """Determine if StyleRule is top level.
@@ -301,36 +492,140 @@ class StyleRule(
         """
         return isinstance(self._parent, StyleSheet)
 
-    def _to_string_recursive(self):
-        """Convert all child rules into a single stirng in css format.
+    def _mark_dirty(self):
+        """Reset the cached rule block and hashes after the rule changed.
 
-        Loop through all of the rules and generate a stylesheet string.
+        The properties of the "*" rule are output by the StyleSheet so it is
+        marked dirty as well.
 
         """
-        stylesheet = self.toString(recursive=False)
-        for rule in self._child_rules.values():
-            stylesheet += rule.toString(recursive=False)
-        return stylesheet
+        self.__dict__["_block"] = None
+        self.__dict__.pop("_snapshot", None)
+        self._invalidate_hash()
+        if self._name == "*" and isinstance(self._parent, StyleSheet):
+            self._parent._mark_dirty()
 
-    def _to_string(self, recursive=False):
-        """Convert to a single string in css format.
+    def _invalidate_hash(self):
+        """Reset the cached content hash of the rule and all its ancestors.
+
+        An ancestor can only have a cached hash if all of its descendants
+        have one, so the walk stops at the first rule which is already reset.
+
+        """
+        rule = self
+        while rule is not None and rule.__dict__.get("_hash") is not None:
+            rule.__dict__["_hash"] = None
+            rule = rule._parent
+
+    def content_hash(self):
+        """Return a digest of the content of the StyleRule and its descendants.
+
+        The digest covers the class, name and value of the StyleRule and the
+        keys and content of its children in order. It is cached and only
+        recomputed along the path of a change, so it can be compared to a
+        previously returned digest to cheaply check if a stylesheet changed.
+        The digest is a SHA-1 hash, so equal digests mean equal content.
+
+        """
+        result = self._hash
+        if result is None:
+            parts = [_encode_content((
+                type(self).__name__, self._name, _hash_value(self._value)
+            ))]
+            for key, child in self.items():
+                parts.append(child._content(key))
+            result = self._hash = _digest(parts)
+        return result
+
+    def _content(self, key):
+        """Return the key and digest of the rule to digest in its parent.
+
+        The digest has a fixed size, so it is marked with "#" after the repr
+        of the key instead of being quoted.
+
+        :param key: The key of the rule in its parent
+
+        """
+        return _encode_content(key) + b"#" + self.content_hash()
+
+    def _rule_block(self):
+        """Return the selector and properties of this rule in css format.
+
+        The block is cached until the rule is marked dirty.
+        Return an empty string if the rule has no property values.
+
+        """
+        block = self._block
+        if block is None:
+            block = self._block = self._format_rule_block()
+        return block
+
+    def _format_rule_block(self):
+        """Format the selector and properties of this rule in css format.
+
+        A deferred rule block is output from its source text unless a child
+        rule was given a value since.
+
+        """
+        deferred = self._deferred
+        if deferred is not None:
+            if not isinstance(deferred[0], tuple) and not any(
+                child.value is not None for child in _dict_values(self)
+            ):
+                return "".join([self.selector, " {", deferred[0], "}\n"])
+            self._materialize()
+        properties = [
+            "    {0}: {1};\n".format(key, rule.value)
+            for key, rule in self.items() if rule.value is not None
+        ]
+        if not properties:
+            return ""
+        return "".join([self.selector, " {\n"] + properties + ["}\n"])
+
+    def _iter_chunks(self, recursive=False):
+        """Yield the rule blocks in css format one at a time.
 
         :param recursive: Output all of the sub-style rules.
 
         """
+        block = self._rule_block()
+        if block:
+            yield block
         if recursive:
-            return self._to_string_recursive()
-        rule_template = "{selector} {{\n{properties}}}\n"
-        prop_template = "    {}: {};\n"
-        properties = ""
-        sheet = ""
-        selector = self.selector
-        for key, rule in self.items():
-            if rule.value is not None:
-                properties += prop_template.format(key, rule.value)
-        if properties:
-            sheet = rule_template.format(**locals())
-        return sheet
+            for rule in self._iter_rules():
+                block = rule._rule_block()
+                if block:
+                    yield block
+
+    def _to_string(self, *args, **kwargs):
+        """Convert to a single string in css format.
+
+        :param recursive: Output all of the sub-style rules.
+
+        """
+        return "".join(self._iter_chunks(*args, **kwargs))
+
+    def iter_chunks(self, *args, **kwargs):
+        """Iterate over the output in css format one rule block at a time.
+
+        Takes the same arguments as :meth:`toString` and yields strings which
+        concatenate to its output without building the whole string.
+
+        """
+        return self._iter_chunks(*args, **kwargs)
+
+    def write(self, fileobj, *args, **kwargs):
+        """Write the output in css format to a file object.
+
+        The rule blocks are streamed to the file object one at a time.
+        To send the stylesheet through a socket, use the file object
+        returned by `socket.makefile("w")`.
+
+        :param fileobj: An object with a write method accepting strings
+
+        """
+        for chunk in self._iter_chunks(*args, **kwargs):
+            fileobj.write(chunk)
 
     def toString(self, *args, **kwargs):
         """Convert to a single string in css format.
@@ -348,17 +643,286 @@ class StyleRule(
             else:
                 self.__getattribute__(key).setValue(value)
 
+    def _set_props(self, items):
+        """Set property values in bulk.
+
+        Same as setting each item with ``self[key] = value`` but the
+        PropRules are added to the ordered dict directly and the rule is
+        only marked dirty once. Keys of pseudo-properties and other
+        attributes which are not properties go through __setitem__.
+
+        :param items: Iterable of (key, value) tuples
+
+        """
+        if self._deferred is not None:
+            self._materialize()
+        changed = False
+        for key, value in items:
+            if key in self._rule_options:
+                self[key] = value
+                continue
+            key = self._sanitize_key(key)
+            existing = self.get(key)
+            if existing is not None and not isinstance(existing, PropRule):
+                self.set_child_rule(key, value)
+                continue
+            prop = PropRule(name=key, value=value, parent=self)
+            super(StyleRule, self).__setitem__(key, prop)
+            changed = True
+        if changed:
+            self._mark_dirty()
+
+    def _defer_props(self, body, names):
+        """Defer building the declarations of a rule block.
+
+        The PropRules are only built by :meth:`_materialize` when the rule
+        is looked up by one of the property names, iterated or modified.
+        Until then the rule block is output from the source text as is.
+
+        Blocks which would create child rules or add to existing property
+        values are built right away.
+
+        :param body: The source text between the braces of the rule block
+        :param names: The property names declared in the block
+
+        """
+        if (
+            self._deferred is not None or
+            not self._rule_options.isdisjoint(names) or
+            any(
+                isinstance(child, PropRule) or child.value is not None
+                for child in _dict_values(self)
+            )
+        ):
+            import qstylizer.parser
+            self._set_props(qstylizer.parser._parse_declarations(body))
+            return
+        self._deferred = (
+            body, frozenset(self._sanitize_key(name) for name in names),
+            collections.OrderedDict.__len__(self)
+        )
+        self._mark_dirty()
+
+    def _materialize(self):
+        """Build the PropRules of the deferred rule block.
+
+        The PropRules are inserted before the child rules added after the
+        block was deferred, in the same order as if built right away.
+
+        """
+        body, _, count = self._deferred
+        self._deferred = None
+        if isinstance(body, tuple):
+            self._unshare(body, count)
+            return
+
+        import qstylizer.parser
+        later = list(collections.OrderedDict.keys(self))[count:]
+        self._set_props(qstylizer.parser._parse_declarations(body))
+        for key in later:
+            try:
+                self.move_to_end(key)
+            except AttributeError:
+                value = collections.OrderedDict.pop(self, key)
+                collections.OrderedDict.__setitem__(self, key, value)
+
+    def _unshare(self, children, count):
+        """Build the PropRules shared with the rule this one was cloned from.
+
+        The children are inserted back in the order of the original rule,
+        followed by the child rules added to the clone since.
+
+        :param children: Tuple of (key, value) children of the original rule
+        :param count: The number of child rules of the clone when it was made
+
+        """
+        items = list(_dict_items(self))
+        rules = dict(items[:count])
+        collections.OrderedDict.clear(self)
+        for key, value in children:
+            child = rules.get(key)
+            if child is None:
+                child = PropRule.__new__(PropRule)
+                child._name = key
+                child._value = value
+                child._parent = self
+            collections.OrderedDict.__setitem__(self, key, child)
+        for key, child in items[count:]:
+            collections.OrderedDict.__setitem__(self, key, child)
+
+    def _take_snapshot(self):
+        """Return a snapshot of the children to share with clones.
+
+        Return a tuple of the (key, value) children, with a value of None
+        for the child rules, and the frozenset of the property keys. The
+        snapshot is cached until the rule changes.
+
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            children = tuple(
+                (key, child._value if isinstance(child, PropRule) else None)
+                for key, child in _dict_items(self)
+            )
+            keys = frozenset(
+                key for key, child in _dict_items(self)
+                if isinstance(child, PropRule)
+            )
+            snapshot = self.__dict__["_snapshot"] = (children, keys)
+        return snapshot
+
     def update(self, *args, **kwargs):
+        """Merge the rules and property values of another StyleRule.
+
+        Same as :meth:`merge` with the "override" policy.
+
+        """
         if isinstance(args[0], StyleRule):
-            for key, child_rule in args[0]._child_rules.items():
-                rule = self.find_or_create_child_rule(key)
+            self.merge(args[0])
+
+    def merge(self, other, policy="override"):
+        """Merge the rules and property values of another StyleRule.
+
+        Rules are matched by their keys from the top of both trees, which
+        are walked once. Missing rules are created in the order they appear
+        in the other StyleRule and the property values are shared with it.
+
+        A property value set in both StyleRules with different values is
+        a conflict, resolved by the policy:
+
+        * "override": use the value of the other StyleRule.
+        * "keep": keep the existing value.
+        * "error": raise a ValueError without changing the StyleRule.
+
+        .. code-block:: python
+
+            >>> css.merge(plugin_css, policy="keep")
+            [MergeConflict(selector='QWidget', prop='color', old='red',
+                           new='blue')]
 
-                for k, v in child_rule.items():
-                    if isinstance(v, StyleRule):
-                        v = copy.deepcopy(v)
-                        v._parent = rule
+        :param other: The StyleRule to merge.
+        :param policy: How to resolve conflicts.
+        :return: The list of :data:`MergeConflict` found.
 
-                        rule[k] = v
+        """
+        if policy not in MERGE_POLICIES:
+            raise ValueError("Invalid merge policy: {0!r}".format(policy))
+        if policy == "error":
+            conflicts = self._merge(other, "keep", apply=False)
+            if conflicts:
+                raise ValueError("Conflicting values: {0}".format(", ".join(
+                    "{0} {{ {1}: {2} != {3} }}".format(*conflict)
+                    for conflict in conflicts
+                )))
+        return self._merge(other, policy)
+
+    def _merge(self, other, policy, apply=True):
+        """Merge another StyleRule and return the conflicts.
+
+        :param other: The StyleRule to merge.
+        :param policy: "override" or "keep".
+        :param apply: Only collect the conflicts if False.
+
+        """
+        keys = {}
+        stack = [other]
+        while stack:
+            rule = stack.pop()
+            for key, child in _dict_items(rule):
+                if not isinstance(child, PropRule):
+                    keys[id(child)] = key
+                    stack.append(child)
+
+        override = policy == "override"
+        conflicts = []
+        targets = {id(other): self}
+        for rule in [other] + list(other._iter_rules()):
+            if rule is other:
+                target = self
+            else:
+                parent = targets[id(rule._parent)]
+                target = None
+                if parent is not None:
+                    target = parent._merge_rule(
+                        keys[id(rule)], rule, override, conflicts, apply
+                    )
+                targets[id(rule)] = target
+            if target is not None:
+                target._merge_props(
+                    _prop_items(rule), override, conflicts, apply
+                )
+        return conflicts
+
+    def _merge_rule(self, key, rule, override, conflicts, apply):
+        """Return the child rule to merge a rule of another StyleRule into.
+
+        The child rule is created if missing. A property with the same key
+        is replaced by a rule holding its value.
+
+        """
+        existing = self.get(key)
+        value = rule._value
+        if existing is not None and value is not None:
+            old = existing._value
+            if old is not None and old != value:
+                conflicts.append(
+                    MergeConflict(self.selector, key, old, value)
+                )
+                if not override:
+                    value = old
+        if not apply:
+            return existing if isinstance(existing, StyleRule) else None
+        if isinstance(existing, StyleRule):
+            if value is not None and value != existing._value:
+                existing.setValue(value)
+            return existing
+        if existing is not None and value is None:
+            value = existing._value
+        child = type(rule)(name=rule._name, value=value, parent=self)
+        self.set_child_rule(key, child)
+        return child
+
+    def _merge_props(self, items, override, conflicts, apply):
+        """Merge property values of another StyleRule into the rule.
+
+        New PropRules are added to the ordered dict directly and the rule is
+        only marked dirty once.
+
+        """
+        if not items:
+            return
+        if apply and self._deferred is not None:
+            self._materialize()
+        changed = False
+        for key, value in items:
+            existing = self.get(key)
+            if existing is None:
+                if apply:
+                    prop = PropRule.__new__(PropRule)
+                    prop._name = key
+                    prop._value = value
+                    prop._parent = self
+                    collections.OrderedDict.__setitem__(self, key, prop)
+                    changed = True
+                continue
+            old = existing._value
+            if old == value:
+                continue
+            if old is not None:
+                conflicts.append(
+                    MergeConflict(self.selector, key, old, value)
+                )
+                if not override:
+                    continue
+            if not apply:
+                continue
+            if isinstance(existing, PropRule):
+                existing._value = value
+                changed = True
+            else:
+                existing.setValue(value)
+        if changed:
+            self._mark_dirty()
 
     def setValues(self, *args, **kwargs):
         """Set property values in the style rule.
@@ -371,6 +935,9 @@ class StyleRule(
     def _set_value(self, value):
         """Set property value."""
         self._value = self._sanitize_value(value)
+        self._invalidate_hash()
+        if self._parent is not None:
+            self._parent._mark_dirty()
 
     def setValue(self, value):
         """Set property value.
@@ -394,6 +961,35 @@ class StyleRule(
         """
         return self.find_or_create_child_rule(key)
 
+    def __delitem__(self, key, **kwargs):
+        """Override the deletion of a value in ordered dict.
+
+        Reset the cached selectors if the rule becomes a leaf.
+
+        :param key: The hash key of the ordered dict
+
+        """
+        if self._deferred is not None:
+            self._materialize()
+        value = self.get(key)
+        super(StyleRule, self).__delitem__(key, **kwargs)
+        self._rule_count -= not isinstance(value, PropRule)
+        self._remove_child_rule(value)
+        self._mark_dirty()
+        if not isinstance(value, PropRule) and self._is_leaf_scoped():
+            self._invalidate_selector()
+
+    def clear(self):
+        """Remove all rules from the ordered dict and the root index."""
+        self._deferred = None
+        for value in list(_dict_values(self)):
+            self._remove_child_rule(value)
+        super(StyleRule, self).clear()
+        self._rule_count = 0
+        self._mark_dirty()
+        if self._is_leaf_scoped():
+            self._invalidate_selector()
+
     def __delattr__(self, name):
         """Override the deletion of an attribute.
 
@@ -418,7 +1014,12 @@ class StyleRule(
 
         """
         if name.startswith("_"):
-            return super(StyleRule, self).__setattr__(name, val)
+            super(StyleRule, self).__setattr__(name, val)
+            if name in ("_name", "_parent"):
+                self._invalidate_selector()
+            if name == "_name":
+                self._invalidate_hash()
+            return None
         elif name in self._attributes:
             return self._attributes[name].__set__(self, val)
         return self.set_child_rule(name, val)
@@ -435,9 +1036,7 @@ class StyleRule(
         """
         if key in self._attr_options:
             if "-" in key:
-                key = key.replace("-", "_")
-                key = inflection.camelize(key)
-                key = key[0].lower() + key[1:]
+                key = ATTRIBUTE_NAMES.get_or_set(key, _attribute_name)
             try:
                 return self._attributes[key].__set__(self, value)
             except KeyError:
@@ -447,31 +1046,260 @@ class StyleRule(
     def __deepcopy__(self, memo):
         """Override deepcopy.
 
-        Make a deepcopy of all member attributes as well as all rule rules
-        in ordered dictionary.
+        Make a copy-on-write clone of the StyleRule and its descendants.
+        The child rules are copied right away, but the PropRules of each
+        rule are shared with the original as a snapshot of their keys and
+        values. They are only built in the clone when it is looked up by
+        property name, iterated or modified, like the declarations of a
+        lazily parsed rule block. Changing the original afterwards does not
+        affect the snapshot.
+
+        The cached selectors, rule blocks and content hashes are kept, so
+        outputting or diffing an unchanged clone does no work. The rules of
+        the clone are indexed in the same order as the original.
 
         """
-        cls = self.__class__
-        result = cls.__new__(cls)
-        result._name = self._name
-        result._value = self._value
-        result._parent = None
-        result._child_rules = collections.OrderedDict()
-        memo[id(self)] = result
-        for k, v in self.__dict__.items():
-            if k in ("_child_rules",):
-                continue
-            setattr(result, k, copy.deepcopy(v, memo))
+        result = type(self).__new__(type(self))
+        stack = [(self, result, None)]
+        while stack:
+            rule, clone, parent = stack.pop()
+            memo[id(rule)] = clone
+            state = clone.__dict__
+            state.update(rule.__dict__)
+            for key, value in rule.__dict__.items():
+                if key not in _SHARED_STATE:
+                    state[key] = copy.deepcopy(value, memo)
+            state["_parent"] = parent
+            state["_rule_index"] = None
+
+            children = None
+            for key, child in _dict_items(rule):
+                if isinstance(child, PropRule):
+                    children = True
+                    continue
+                child_clone = type(child).__new__(type(child))
+                collections.OrderedDict.__setitem__(clone, key, child_clone)
+                stack.append((child, child_clone, clone))
+            if children and rule._deferred is None:
+                children, keys = rule._take_snapshot()
+                state["_deferred"] = (
+                    children, keys, collections.OrderedDict.__len__(clone)
+                )
+
+        index = result.__dict__["_rule_index"] = collections.OrderedDict()
+        for rule in self._iter_rules():
+            clone = memo[id(rule)]
+            clone.__dict__["_order"] = next(_rule_order)
+            index[id(clone)] = clone
+
+        result.__dict__["_parent"] = self._parent
+        return result
 
-        result.clear()
-        for k, v in self.items():
-            if isinstance(v, StyleRule):
-                v = copy.deepcopy(v, memo)
-                v._parent = result
-                result.set_child_rule(k, v)
+    def __reduce__(self):
+        """Pickle the attributes and children of the StyleRule.
 
-        result._parent = self._parent
-        return result
+        The children are restored by :meth:`__setstate__` directly in the
+        ordered dict, as setting them through __setitem__ would copy the
+        child rules held by descriptors.
+
+        """
+        state = dict(self.__dict__)
+        return _new_rule, (type(self),), (state, list(_dict_items(self)))
+
+    def __setstate__(self, state):
+        """Restore a pickled StyleRule.
+
+        The root rule index is keyed by the ids of the rules, so it is
+        rebuilt with the ids and positions of the unpickled rules.
+
+        """
+        attributes, children = state
+        index = attributes.get("_rule_index")
+        if index is not None:
+            attributes["_rule_index"] = collections.OrderedDict()
+            for rule in index.values():
+                rule.__dict__["_order"] = next(_rule_order)
+                attributes["_rule_index"][id(rule)] = rule
+        self.__dict__.update(attributes)
+        for key, child in children:
+            collections.OrderedDict.__setitem__(self, key, child)
+
+    def to_records(self):
+        """Export the descendants of the StyleRule as a flat list of tuples.
+
+        The records hold plain strings rather than StyleRule objects, so they
+        are much smaller and faster to pickle than the rules themselves.
+        Each child is recorded in order after its parent with the tuple of
+        keys leading to the parent:
+
+        * A property is recorded as (path, key, value).
+        * A rule is recorded as (path, key, value, class_name, name, rank),
+          where rank is its position in the order the rules were added.
+
+        Equal strings and paths are stored as a single object, which pickle
+        only writes once.
+
+        .. code-block:: python
+
+            >>> css.QCheckBox.indicator.border.setValue("none")
+            >>> css.to_records()
+            [((), 'QCheckBox', None, 'ClassRule', 'QCheckBox', 0),
+             (('QCheckBox',), 'indicator', None, 'SubControlRule',
+              'indicator', 1),
+             (('QCheckBox', 'indicator'), 'border', 'none')]
+
+        """
+        strings = {}
+
+        def intern(value):
+            if isinstance(value, _STRING_TYPES):
+                return strings.setdefault(value, value)
+            return value
+
+        ranks = dict(
+            (id(rule), rank) for rank, rule in enumerate(self._iter_rules())
+        )
+        records = []
+        stack = [((), iter(list(self.items())))]
+        while stack:
+            path, children = stack[-1]
+            for key, child in children:
+                key = intern(key)
+                if isinstance(child, PropRule):
+                    records.append((path, key, intern(child._value)))
+                    continue
+                records.append((
+                    path, key, intern(child._value),
+                    intern(type(child).__name__), intern(child._name),
+                    ranks[id(child)]
+                ))
+                stack.append((path + (key,), iter(list(child.items()))))
+                break
+            else:
+                stack.pop()
+        return records
+
+    @classmethod
+    def from_records(cls, records):
+        """Create a StyleRule from the records of :meth:`to_records`.
+
+        The rules are rebuilt as they were, including the order of their
+        children and the order they are output in.
+
+        :param records: List of tuples returned by :meth:`to_records`
+
+        """
+        classes = {}
+        subclasses = [StyleRule]
+        while subclasses:
+            class_ = subclasses.pop()
+            classes[class_.__name__] = class_
+            subclasses.extend(class_.__subclasses__())
+
+        # The rules are created without __init__ and their attributes set in
+        # their __dict__, so that no invalidation is triggered for rules
+        # which are not part of a tree yet.
+        root = cls()
+        rules = {(): root}
+        ranked = []
+        set_item = collections.OrderedDict.__setitem__
+        for record in records:
+            path, key, value = record[:3]
+            parent = rules[path]
+            if len(record) == 3:
+                child = PropRule.__new__(PropRule)
+                child._name = key
+                child._value = value
+                child._parent = parent
+            else:
+                class_ = classes[record[3]]
+                child = class_.__new__(class_)
+                child.__dict__.update(
+                    _selector=None, _block=None, _hash=None, _rule_count=0,
+                    _name=record[4], _parent=parent, _value=value,
+                    _rule_index=None
+                )
+                rules[path + (key,)] = child
+                ranked.append((record[5], child))
+                parent.__dict__["_rule_count"] += 1
+            set_item(parent, key, child)
+
+        ranked.sort(key=lambda item: item[0])
+        index = root._rule_index = collections.OrderedDict()
+        for _, rule in ranked:
+            index[id(rule)] = rule
+            rule.__dict__["_order"] = next(_rule_order)
+        return root
+
+    def get(self, key, default=None):
+        """Return the child for key, building deferred properties if needed."""
+        deferred = self._deferred
+        if deferred is not None and key in deferred[1]:
+            self._materialize()
+        return collections.OrderedDict.get(self, key, default)
+
+    def __contains__(self, key):
+        deferred = self._deferred
+        if deferred is not None and key in deferred[1]:
+            self._materialize()
+        return collections.OrderedDict.__contains__(self, key)
+
+    def __iter__(self):
+        if self._deferred is not None:
+            self._materialize()
+        return collections.OrderedDict.__iter__(self)
+
+    def __len__(self):
+        if self._deferred is not None:
+            self._materialize()
+        return collections.OrderedDict.__len__(self)
+
+    def keys(self):
+        if self._deferred is not None:
+            self._materialize()
+        return collections.OrderedDict.keys(self)
+
+    def values(self):
+        if self._deferred is not None:
+            self._materialize()
+        return collections.OrderedDict.values(self)
+
+    def items(self):
+        if self._deferred is not None:
+            self._materialize()
+        return collections.OrderedDict.items(self)
+
+    def __eq__(self, other):
+        """Compare the content of two StyleRules.
+
+        StyleRules are equal if they have the same class, name, value and
+        children in the same order. Values of different types are not
+        equal, as they are output differently. If both content digests are cached they
+        are compared instead of walking the subtrees.
+
+        """
+        if self is other:
+            return True
+        if not isinstance(other, StyleRule):
+            return super(StyleRule, self).__eq__(other)
+        if (
+            type(self) is not type(other) or
+            self._name != other._name or
+            not _same_value(self._value, other._value) or
+            len(self) != len(other)
+        ):
+            return False
+        if self._hash is not None and other._hash is not None:
+            return self._hash == other._hash
+        return super(StyleRule, self).__eq__(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
 
     def __repr__(self, *args, **kwargs):
         """Set the representation to look like xml syntax."""
@@ -509,62 +1337,63 @@ class StyleSheet(StyleRule, qstylizer.descriptor.qclass.ClassStyleParent):
         """
         return self.is_leaf()
 
-    def _to_string_recursive(self):
-        """Convert all child rules into a single stirng in css format.
+    def _format_rule_block(self):
+        """Format the global properties in css format.
 
-        Loop through all of the rules and generate a stylesheet string.
+        The properties of the "*" rule are output along with the global
+        properties, within a "* {}" block unless the StyleSheet is global
+        scope.
 
         """
-        stylesheet = self.toString(recursive=False)
-        for key, rule in self._child_rules.items():
-            if key == "*":
-                continue
-            stylesheet += rule.toString(recursive=False)
-        return stylesheet
-
-    def _to_string(self, recursive=True):
-        """Return the selector and properties as a single string.
-
-        :param recursive: Loop through all rules to generate a stylesheet.
+        prop_template = "    {0}: {1};\n"
+        global_scope = self.is_global_scope()
+        if global_scope:
+            prop_template = "{0}: {1};\n"
 
-        """
-        if recursive:
-            return self._to_string_recursive()
-
-        rule_template = "{selector} {{\n{properties}}}\n"
-        prop_template = "    {}: {};\n"
-        selector = self.selector
-        if self.is_global_scope():
-            rule_template = "{properties}"
-            prop_template = "{}: {};\n"
-        else:
-            selector = "*"
-
-        properties = ""
-        sheet = ""
+        properties = []
         for key, value in self.items():
 
             # Output the "*" property values if applicable.
             if key == "*":
-                for global_key, global_value in self.__getitem__("*").items():
-                    if not isinstance(global_value, StyleRule):
-                        properties += prop_template.format(
-                            global_key, global_value
+                for global_key, global_value in self.get("*").items():
+                    if not isinstance(global_value, (StyleRule, PropRule)):
+                        properties.append(
+                            prop_template.format(global_key, global_value)
                         )
                     elif global_value.value is not None:
-                        properties += prop_template.format(
-                            global_key, global_value.value
+                        properties.append(
+                            prop_template.format(
+                                global_key, global_value.value
+                            )
                         )
 
-            if not isinstance(value, StyleRule):
-                properties += prop_template.format(key, value)
+            if not isinstance(value, (StyleRule, PropRule)):
+                properties.append(prop_template.format(key, value))
             elif value.value is not None:
-                properties += prop_template.format(key, value.value)
+                properties.append(prop_template.format(key, value.value))
 
-        if properties:
-            sheet = rule_template.format(**locals())
+        if not properties or global_scope:
+            return "".join(properties)
+        return "".join(["* {\n"] + properties + ["}\n"])
 
-        return sheet
+    def _iter_chunks(self, recursive=True):
+        """Yield the rule blocks in css format one at a time.
+
+        The "*" rule is output with the global properties.
+
+        :param recursive: Loop through all rules to generate a stylesheet.
+
+        """
+        block = self._rule_block()
+        if block:
+            yield block
+        if recursive:
+            for rule in self._iter_rules():
+                if rule.selector == "*":
+                    continue
+                block = rule._rule_block()
+                if block:
+                    yield block
 
     @property
     def name(self):
@@ -633,8 +1462,12 @@ class StyleRuleList(StyleRule):
 
     @staticmethod
     def _sanitize_key(key):
-        """Strip the key of newlines only."""
-        return str(key).replace("\n", "")
+        """Strip the key of newlines only.
+
+        The result is memoized in :data:`SANITIZED_LIST_KEYS`.
+
+        """
+        return SANITIZED_LIST_KEYS.get_or_set(str(key), _sanitize_list_key)
 
     def _create_child_rules_in_parent(self, name, val):
         """Find or create value in parent StyleRule
@@ -653,6 +1486,46 @@ class StyleRuleList(StyleRule):
             )
         return None
 
+    def _set_props(self, items):
+        """Set property values in each rule of the parent StyleRule.
+
+        The rules are looked up again for each item as setting a
+        pseudo-property can replace one of them.
+
+        :param items: Iterable of (key, value) tuples
+
+        """
+        rule_names = self.name.split(",")
+        for item in items:
+            for rule_name in rule_names:
+                self._parent.find_or_create_child_rule(rule_name)._set_props(
+                    (item,)
+                )
+
+    def _defer_props(self, body, names):
+        """Defer building the declarations in each rule of the parent.
+
+        Blocks declaring pseudo-properties or with rules nested in one of
+        the other rules are built right away, so that the rules and
+        properties are added in the same order as :meth:`_set_props`.
+
+        :param body: The source text between the braces of the rule block
+        :param names: The property names declared in the block
+
+        """
+        rule_names = self.name.split(",")
+        if not ClassRule._rule_options.isdisjoint(names) or any(
+            other != rule_name and other.startswith(rule_name)
+            for rule_name in rule_names for other in rule_names
+        ):
+            import qstylizer.parser
+            self._set_props(qstylizer.parser._parse_declarations(body))
+            return
+        for rule_name in rule_names:
+            self._parent.find_or_create_child_rule(rule_name)._defer_props(
+                body, names
+            )
+
     @property
     def scope_operator(self):
         return ""
@@ -665,7 +1538,7 @@ class StyleRuleList(StyleRule):
 
         """
         if name.startswith("_"):
-            return super(StyleRule, self).__setattr__(name, val)
+            return super(StyleRuleList, self).__setattr__(name, val)
         return self._create_child_rules_in_parent(name, val)
 
     def __setitem__(self, key, value, **kwargs):
@@ -729,34 +1602,419 @@ class PseudoPropRule(PseudoStateRule):
     """
 
 
-class PropRule(StyleRule):
+class PropRule(object):
     """The PropRule definition.
 
     Example prop rule name: "background-color".
 
+    A PropRule is a leaf holding a single property value. Unlike the other
+    rules it is not an ordered dictionary and uses __slots__ to keep its
+    memory footprint small.
+
     """
+    __slots__ = ("_name", "_parent", "_value")
+
+    def __init__(self, name=None, value=None, parent=None):
+        """Initialize the PropRule.
+
+        :param name: The name of the property
+        :param value: The property value
+        :param parent:  The parent StyleRule
+
+        """
+        self._name = StyleRule._sanitize_key(name) if name else None
+        self._parent = parent
+        self._value = StyleRule._sanitize_value(value)
+
+    def __getstate__(self):
+        """Return the name, parent and value to pickle.
+
+        Classes with __slots__ have no __dict__ to pickle with the protocols
+        below 2, nor with any protocol on Python 2.
+
+        """
+        return self._name, self._parent, self._value
+
+    def __setstate__(self, state):
+        """Restore the name, parent and value of a pickled PropRule."""
+        self._name, self._parent, self._value = state
+
+    @property
+    def selector(self):
+        """Get the selector.
+
+        Example::
+
+            Object::subcontrol:property
+
+        """
+        if self._parent is None:
+            return self.name if self.name else ""
+        return self._parent.selector + self.scope_operator + self.name
+
+    @property
+    def name(self):
+        """Return the name of the property (eg. "background-color")."""
+        return self._name
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @property
+    def scope_operator(self):
+        """Get the scope operator."""
+        if self.is_top_level():
+            return ""
+        return ":"
+
+    def is_leaf(self):
+        """A PropRule is always a leaf."""
+        return True
+
+    def is_top_level(self):
+        """Determine if PropRule is top level.
+
+        PropRule is top level if its parent is of the StyleSheet class.
+
+        """
+        return isinstance(self._parent, StyleSheet)
+
+    def toString(self, *args, **kwargs):
+        """A PropRule has no rule block of its own."""
+        return ""
+
+    def _set_value(self, value):
+        """Set property value."""
+        self._value = StyleRule._sanitize_value(value)
+        if self._parent is not None:
+            self._parent._mark_dirty()
+
+    def setValue(self, value):
+        """Set property value.
+
+        Use camelcase for function name to match PyQt/PySide.
+
+        """
+        self._set_value(value)
+
+    @property
+    def value(self):
+        return self._value
+
+    def content_hash(self):
+        """Return a digest of the name and value of the property."""
+        return _digest([self._content(self._name)])
+
+    def _content(self, key):
+        """Return the key, name and value of the property to digest.
+
+        Properties are not digested on their own in their parent as their
+        name and value are about as short as a digest.
+
+        :param key: The key of the property in its parent
+
+        """
+        return _encode_content((
+            key, type(self).__name__, self._name, _hash_value(self._value)
+        ))
+
+    def __eq__(self, other):
+        if not isinstance(other, PropRule):
+            return NotImplemented
+        return (
+            self._name == other._name and
+            _same_value(self._value, other._value)
+        )
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        """Copy the name and value, the parent is reassigned by the caller."""
+        cls = self.__class__
+        result = cls.__new__(cls)
+        memo[id(self)] = result
+        result._name = self._name
+        result._parent = self._parent
+        result._value = copy.deepcopy(self._value, memo)
+        return result
+
+    def __repr__(self):
+        """Set the representation to look like xml syntax."""
+        value_attr = ""
+        name_attr = ""
+        if self.value is not None:
+            value_attr = "value={0!r} ".format(self.value)
+        if self.name is not None:
+            name_attr = "name={0!r} ".format(self.name)
+        return "<{0} {1}{2}/>".format(
+            self.__class__.__name__, name_attr, value_attr
+        )
+
+    def __str__(self):
+        return self.toString()
+
+
+def tokenize_selector(selector):
+    """Split a selector into a tuple of :data:`SelectorToken`.
+
+    The selector is scanned once with the *_split_regex* of StyleRule,
+    after replacing dashes with underscores. Each token has a kind:
+
+    * "universal": ``*``
+    * "class": ``QCheckBox``
+    * "name": a bare name which is not a class, like ``indicator``
+    * "object": ``#objectName``
+    * "subcontrol": ``::indicator``
+    * "pseudostate": ``:hover``
+    * "negated": ``:!hover``
+    * "property": ``[flat="true"]``
+    * "descendant": `` QLabel``
+    * "child": `` > QLabel``
+
+    The tokens are memoized in :data:`SELECTOR_TOKENS`.
+
+    .. code-block:: python
+
+        >>> tokenize_selector("QCheckBox::indicator:!checked")
+        (SelectorToken(kind='class', text='QCheckBox'),
+         SelectorToken(kind='subcontrol', text='::indicator'),
+         SelectorToken(kind='negated', text=':!checked'))
+
+    :param selector: The selector string
+
+    """
+    return SELECTOR_TOKENS.get_or_set(selector, _tokenize_selector)
+
+
+def _tokenize_selector(selector):
+    """Split a selector into a tuple of :data:`SelectorToken`.
+
+    The *_split_regex* is compiled the first time, so that importing the
+    module does not import :mod:`re`.
+
+    """
+    global _split_pattern
+    if _split_pattern is None:
+        import re
+        _split_pattern = re.compile(StyleRule._split_regex)
+    texts = _split_pattern.findall(selector.replace("-", "_"))[:-1]
+    return tuple(
+        SelectorToken(_token_kind(text), text) for text in texts
+    )
+
+
+def _token_kind(text):
+    """Return the kind of a selector token from its leading characters."""
+    if text == "*":
+        return "universal"
+    if text.startswith("::"):
+        return "subcontrol"
+    if text.startswith(":!"):
+        return "negated"
+    first = text[:1]
+    if first == ":":
+        return "pseudostate"
+    if first == "#":
+        return "object"
+    if first == "[":
+        return "property"
+    stripped = text.lstrip()
+    if stripped.startswith(">"):
+        return "child"
+    if stripped != text:
+        return "descendant"
+    if first.isupper():
+        return "class"
+    return "name"
 
 
 def rule_class(name):
     """Determine StyleRule subclass from string name.
 
+    Known subcontrol, pseudostate and class names are looked up in a
+    precomputed dispatch table, other names by their first character.
+    Negated names and names with no known first character are memoized in
+    :data:`RULE_CLASSES`.
+
+    :param name: name of type string
+
+    """
+    try:
+        return _RULE_CLASS_TABLE[name]
+    except KeyError:
+        pass
+    if "!" not in name:
+        class_ = _PREFIX_RULE_CLASSES.get(name[:2]) or (
+            _PREFIX_RULE_CLASSES.get(name[:1])
+        )
+        if class_ is not None:
+            return class_
+    return RULE_CLASSES.get_or_set(name, _rule_class)
+
+
+def _rule_class(name):
+    """Determine StyleRule subclass from string name without the table.
+
     :param name: name of type string
 
     """
     if "!" in name:
         name = name.replace("!", "")
         name = name[0].lower() + name[1:]
-    class_ = StyleRule
-    if name.startswith("::") or name in QSUBCONTROLS:
-        class_ = SubControlRule
-    elif name.startswith(":") or name in QPSEUDOSTATES:
-        class_ = PseudoStateRule
-    elif name.startswith("#"):
-        class_ = ObjectRule
-    elif name.startswith(" "):
-        class_ = ChildClassRule
-    elif name in QCLASSES or name.startswith("Q"):
-        class_ = ClassRule
-    elif "=" in name:
-        class_ = ObjectPropRule
-    return class_
+    try:
+        return _RULE_CLASS_TABLE[name]
+    except KeyError:
+        pass
+    class_ = _PREFIX_RULE_CLASSES.get(name[:2]) or (
+        _PREFIX_RULE_CLASSES.get(name[:1])
+    )
+    if class_ is not None:
+        return class_
+    if "=" in name:
+        return ObjectPropRule
+    return StyleRule
+
+
+# Compiled _split_regex of StyleRule, set by _tokenize_selector.
+_split_pattern = None
+
+
+def _build_rule_class_table():
+    """Return the dispatch table of rule_class.
+
+    Map the known names, bare or with their scope operator, to their
+    StyleRule subclass. Subcontrols take precedence over pseudostates,
+    which take precedence over classes.
+
+    """
+    table = {}
+    for name in QCLASSES:
+        table[name] = ClassRule
+    for name in QPSEUDOSTATES:
+        table[name] = table[":" + name] = PseudoStateRule
+    for name in QSUBCONTROLS:
+        table[name] = table["::" + name] = SubControlRule
+    return table
+
+
+_RULE_CLASS_TABLE = _build_rule_class_table()
+
+# StyleRule subclass of the names missing from the dispatch table by their
+# first one or two characters.
+_PREFIX_RULE_CLASSES = {
+    "::": SubControlRule,
+    ":": PseudoStateRule,
+    "#": ObjectRule,
+    " ": ChildClassRule,
+    "Q": ClassRule,
+}
+
+# Access the children without building the properties of deferred rule blocks.
+_dict_values = collections.OrderedDict.values
+_dict_items = collections.OrderedDict.items
+
+
+def _new_rule(cls):
+    """Create an empty StyleRule of a class, used to unpickle StyleRules."""
+    return cls.__new__(cls)
+
+
+def _prop_items(rule):
+    """Return the (key, value) properties of a rule.
+
+    The properties of a clone are read from the snapshot it shares with
+    its original, without building its PropRules.
+
+    """
+    deferred = rule._deferred
+    if deferred is not None and isinstance(deferred[0], tuple):
+        children, keys, _ = deferred
+        return [(key, value) for key, value in children if key in keys]
+    return [
+        (key, child._value) for key, child in rule.items()
+        if isinstance(child, PropRule)
+    ]
+
+
+def _hash_value(value):
+    """Return the type and repr of a property value to digest.
+
+    The value itself would have the same repr as values output differently,
+    like 1 and True.
+
+    """
+    if value is None:
+        return None
+    return type(value).__name__, repr(value)
+
+
+def _same_value(value, other):
+    """Determine if two property values are equal and output the same.
+
+    Values of different types are output differently even if they compare
+    equal, like 1 and True.
+
+    """
+    return type(value) is type(other) and value == other
+
+
+def _encode_content(content):
+    """Return the repr of content to digest as bytes."""
+    return repr(content).encode("utf-8")
+
+
+def _digest(parts):
+    """Return the SHA-1 digest of a list of bytes."""
+    import hashlib
+    return hashlib.sha1(b"".join(parts)).digest()
+
+
+def _sanitize_key(key):
+    """Strip the key of colons and replace underscores with dashes.
+
+    :param key: A string
+
+    """
+    import inflection
+    if (
+        key and key[0] not in ["Q", "#", "[", " "] and
+        key != inflection.camelize(key) and
+        not key.startswith("qproperty-")
+    ):
+        key = inflection.underscore(key)
+
+    if key and key[0] != "[":
+        key = key.replace("not_", "!").replace(":", "").replace("_", "-")
+
+    return NAMES.intern(key)
+
+
+def _sanitize_list_key(key):
+    """Strip the key of newlines.
+
+    :param key: A string
+
+    """
+    return NAMES.intern(key.replace("\n", ""))
+
+
+def _attribute_name(key):
+    """Convert a dashcase option name to its descriptor attribute name.
+
+    Example::
+
+        "background-color" -> "backgroundColor"
+
+    :param key: A string
+
+    """
+    import inflection
+    key = inflection.camelize(key.replace("-", "_"))
+    return key[0].lower() + key[1:]
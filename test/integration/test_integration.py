@@ -288,9 +288,10 @@ def test_pseudoprop_set(css):
 
 def test_add_child_rule(css):
     css.QCheckBox.indicator.backgroundColor.setValue("red")
-    assert len(css._child_rules) == 3
-    assert css.QCheckBox in css._child_rules.values()
-    assert css.QCheckBox.indicator in css._child_rules.values()
+    rules = list(css._iter_rules())
+    assert len(rules) == 2
+    assert rules[0] is css.QCheckBox
+    assert rules[1] is css.QCheckBox.indicator
 
 
 def test_set_values(css):
@@ -331,6 +332,25 @@ def test_global_scope(css):
     )[1:]
 
 
+def test_selector_suffix_not_merged_with_sibling():
+    import qstylizer.parser
+
+    css = qstylizer.parser.parse(
+        "QMenu::tearoff { color: red; } QMenu::tear:off { color: blue; }"
+    )
+
+    assert css.toString() == textwrap.dedent(
+        """
+        QMenu::tearoff {
+            color: red;
+        }
+        QMenu::tear:off {
+            color: blue;
+        }
+        """
+    )[1:]
+
+
 def test_update_overwrite():
     import qstylizer.parser
 
@@ -432,3 +452,225 @@ def test_update_nested():
     )[1:]
 
     assert qss1.QWidget.color.value == "yellow"
+
+
+@pytest.mark.parametrize("policy, color", [
+    ("override", "red"), ("keep", "blue")
+])
+def test_merge_policy(policy, color):
+    import qstylizer.parser
+    import qstylizer.style
+
+    qss1 = qstylizer.parser.parse("QWidget { color: blue; margin: 0; }")
+    qss2 = qstylizer.parser.parse("QWidget { color: red; margin: 0; }")
+
+    conflicts = qss1.merge(qss2, policy=policy)
+
+    assert conflicts == [
+        qstylizer.style.MergeConflict("QWidget", "color", "blue", "red")
+    ]
+    assert qss1.QWidget.color.value == color
+    assert qss1.QWidget.margin.value == "0"
+
+
+def test_merge_error():
+    import qstylizer.parser
+
+    qss1 = qstylizer.parser.parse("QWidget { color: blue; }")
+    qss2 = qstylizer.parser.parse(
+        "QFrame { color: red; } QWidget { color: red; }"
+    )
+    expected = qss1.toString()
+
+    with pytest.raises(ValueError):
+        qss1.merge(qss2, policy="error")
+    assert qss1.toString() == expected
+
+    with pytest.raises(ValueError):
+        qss1.merge(qss2, policy="unknown")
+
+    qss3 = qstylizer.parser.parse("QWidget { color: blue; margin: 0; }")
+    assert qss1.merge(qss3, policy="error") == []
+    assert qss1.QWidget.margin.value == "0"
+
+
+def test_merge_rule_list():
+    import qstylizer.parser
+
+    qss1 = qstylizer.parser.parse("QFrame { color: blue; }")
+    qss2 = qstylizer.parser.parse("QLabel, QFrame { color: red; }")
+
+    qss1.merge(qss2)
+    qss1.merge(qss2)
+
+    assert list(qss1.keys()) == ["QFrame", "QLabel, QFrame", "QLabel"]
+    assert qss1.QFrame.color.value == "red"
+    assert qss1.QLabel.color.value == "red"
+
+
+def test_merge_pseudo_prop():
+    import qstylizer.parser
+
+    qss1 = qstylizer.parser.parse("QTabBar::tab:top { color: green; }")
+    qss2 = qstylizer.parser.parse("QTabBar::tab { top: 0; }")
+
+    assert qss1.merge(qss2) == []
+
+    assert qss1.toString() == textwrap.dedent(
+        """
+        QTabBar::tab {
+            top: 0;
+        }
+        QTabBar::tab:top {
+            color: green;
+        }
+        """
+    )[1:]
+
+
+def test_merge_clone():
+    import copy
+    import qstylizer.parser
+
+    qss1 = qstylizer.parser.parse("QWidget { color: blue; }")
+    qss2 = qstylizer.parser.parse("QWidget:hover { color: red; }")
+    clone = copy.deepcopy(qss2)
+
+    qss1.merge(clone)
+
+    assert clone.QWidget.hover._deferred is not None
+    assert qss1.QWidget.hover.color.value == "red"
+    qss1.QWidget.hover.color.setValue("green")
+    assert clone.QWidget.hover.color.value == "red"
+    assert qss2.QWidget.hover.color.value == "red"
+
+
+def test_delete_rule(css):
+    css.QCheckBox.indicator.hover.color.setValue("red")
+    css.QFrame.color.setValue("green")
+    del css.QCheckBox.indicator
+    assert [rule.selector for rule in css._iter_rules()] == [
+        "QCheckBox", "QFrame"
+    ]
+    assert css.toString() == textwrap.dedent(
+        """
+        QFrame {
+            color: green;
+        }
+        """
+    )[1:]
+
+
+def test_replace_rule(css):
+    import qstylizer.style
+    css.QCheckBox.indicator.color.setValue("red")
+    css.QFrame.color.setValue("green")
+    indicator = qstylizer.style.SubControlRule("indicator")
+    indicator.color.setValue("blue")
+    css.QCheckBox.indicator = indicator
+    assert css.toString() == textwrap.dedent(
+        """
+        QFrame {
+            color: green;
+        }
+        QCheckBox::indicator {
+            color: blue;
+        }
+        """
+    )[1:]
+
+
+def test_subtree_to_string_order(css):
+    css.QCheckBox.color.setValue("red")
+    css.QFrame.color.setValue("green")
+    css.QCheckBox.indicator.color.setValue("blue")
+    css.QCheckBox.hover.color.setValue("yellow")
+    css.QCheckBox.indicator.hover.color.setValue("white")
+    assert css.QCheckBox.toString(recursive=True) == textwrap.dedent(
+        """
+        QCheckBox {
+            color: red;
+        }
+        QCheckBox::indicator {
+            color: blue;
+        }
+        QCheckBox:hover {
+            color: yellow;
+        }
+        QCheckBox::indicator:hover {
+            color: white;
+        }
+        """
+    )[1:]
+
+
+def test_iter_chunks(css):
+    css.backgroundColor.setValue("red")
+    css.QFrame.color.setValue("green")
+    css.QCheckBox.indicator.border.setValue("none")
+    chunks = list(css.iter_chunks())
+    assert chunks == [
+        "* {\n    background-color: red;\n}\n",
+        "QFrame {\n    color: green;\n}\n",
+        "QCheckBox::indicator {\n    border: none;\n}\n",
+    ]
+    assert "".join(chunks) == css.toString()
+    assert list(css.iter_chunks(recursive=False)) == chunks[:1]
+    assert list(css.QCheckBox.iter_chunks(recursive=True)) == chunks[2:]
+
+
+def test_write(css):
+    import io
+    css.QFrame.color.setValue("green")
+    css.QCheckBox.indicator.border.setValue("none")
+    stream = io.StringIO()
+    css.write(stream)
+    assert stream.getvalue() == css.toString()
+
+
+def test_parse_matches_setitem():
+    import qstylizer.parser
+    import qstylizer.style
+    stylesheet = textwrap.dedent("""
+        * {
+            color: red;
+        }
+        QTabBar::tab:top {
+            color: green;
+        }
+        QTabBar::tab {
+            top: 0;
+            color: red;
+            color: blue;
+        }
+        QComboBox, QSpinBox::up-arrow:hover {
+            padding: 1px;
+            left: 2px;
+        }
+        QLineEdit[echoMode="2"] {
+            lineedit-password-character: 9679;
+        }
+        QWidget QFrame#name:!hover {
+            background: url(a;b.png);
+        }
+        QPushButton:pressed {
+        }
+    """)
+    css = qstylizer.style.StyleSheet()
+    for selector, declarations in [
+        ("*", [("color", "red")]),
+        ("QTabBar::tab:top", [("color", "green")]),
+        ("QTabBar::tab", [("top", "0"), ("color", "red"), ("color", "blue")]),
+        ("QComboBox, QSpinBox::up-arrow:hover",
+         [("padding", "1px"), ("left", "2px")]),
+        ('QLineEdit[echoMode="2"]', [("lineedit-password-character", "9679")]),
+        ("QWidget QFrame#name:!hover", [("background", "url(a;b.png)")]),
+    ]:
+        for prop, value in declarations:
+            css[selector][prop] = value
+    parsed = qstylizer.parser.parse(stylesheet)
+    assert parsed.toString() == css.toString()
+    assert [rule.selector for rule in parsed._iter_rules()] == [
+        rule.selector for rule in css._iter_rules()
+    ]
+    assert parsed == css
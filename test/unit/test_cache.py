@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import qstylizer.cache
+
+
+def test_get_and_set():
+    cache = qstylizer.cache.LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert len(cache) == 1
+    assert cache.info() == qstylizer.cache.CacheInfo(
+        hits=1, misses=1, evictions=0, size=1, maxsize=2
+    )
+
+
+def test_eviction_order():
+    cache = qstylizer.cache.LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.info().evictions == 1
+
+
+def test_get_or_set(mocker):
+    cache = qstylizer.cache.LRUCache()
+    factory = mocker.Mock(side_effect=lambda key: key * 2)
+    assert cache.get_or_set("ab", factory) == "abab"
+    assert cache.get_or_set("ab", factory) == "abab"
+    factory.assert_called_once_with("ab")
+    assert cache.info().hits == 1
+    assert cache.info().misses == 1
+
+
+def test_clear():
+    cache = qstylizer.cache.LRUCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.info() == qstylizer.cache.CacheInfo(0, 0, 0, 0, 1024)
+
+
+def test_unbounded():
+    cache = qstylizer.cache.LRUCache(maxsize=None)
+    for index in range(5000):
+        cache.set(index, index)
+    assert len(cache) == 5000
+
+
+def test_thread_safety():
+    cache = qstylizer.cache.LRUCache(maxsize=64)
+
+    def worker():
+        for index in range(2000):
+            cache.get_or_set(index % 100, str)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    info = cache.info()
+    assert info.hits + info.misses == 8000
+    assert info.size <= 64
+
+
+def test_maxbytes():
+    cache = qstylizer.cache.LRUCache(
+        maxsize=None, maxbytes=10, sizeof=lambda key, value: len(value)
+    )
+    cache.set("a", "1234")
+    cache.set("b", "1234")
+    cache.set("a", "123")
+    assert cache.info().bytes == 7
+    cache.set("c", "1234")
+    assert "b" not in cache
+    assert cache.info() == qstylizer.cache.CacheInfo(
+        hits=0, misses=0, evictions=1, size=2, maxsize=None, bytes=7,
+        maxbytes=10
+    )
+    cache.set("d", "12345678901")
+    assert len(cache) == 0
+    assert cache.info().bytes == 0
+
+
+def test_maxbytes_requires_sizeof():
+    with pytest.raises(ValueError):
+        qstylizer.cache.LRUCache(maxbytes=10)
+
+
+def test_intern_table():
+    table = qstylizer.cache.InternTable(maxsize=2)
+    value = table.intern("".join(["co", "lor"]))
+    assert table.intern("".join(["co", "lor"])) is value
+    assert "color" in table
+    table.intern("margin")
+    assert table.info() == qstylizer.cache.InternInfo(
+        total=3, unique=2, maxsize=2
+    )
+    table.intern("border")
+    assert len(table) == 1
+    table.clear()
+    assert table.info() == qstylizer.cache.InternInfo(0, 0, 2)
+
+
+def test_intern_table_memos():
+    memo = qstylizer.cache.LRUCache()
+    table = qstylizer.cache.InternTable(memos=[memo])
+    for _ in range(3):
+        memo.get_or_set("color", table.intern)
+    assert table.info() == qstylizer.cache.InternInfo(
+        total=3, unique=1, maxsize=table.maxsize
+    )
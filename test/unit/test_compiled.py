@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+import qstylizer.compiled
+import qstylizer.parser
+
+
+STYLESHEET = u"""
+QWidget { color: red; }
+QCheckBox::indicator:hover, QLabel { border: 1px solid green; }
+QTabBar::tab { top: 0; }
+"""
+
+
+@pytest.fixture
+def path(tmpdir):
+    path = tmpdir.join("style.qss")
+    path.write_text(STYLESHEET, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    return str(tmpdir.join("cache"))
+
+
+def test_load(path, cache_dir, mocker):
+    css = qstylizer.compiled.load(path, cache_dir=cache_dir)
+    assert css == qstylizer.parser.parse(STYLESHEET)
+    assert len(os.listdir(cache_dir)) == 1
+
+    mocker.spy(qstylizer.parser, "parse")
+    cached = qstylizer.compiled.load(path, cache_dir=cache_dir)
+    assert qstylizer.parser.parse.call_count == 0
+    assert cached == css
+    assert cached.toString() == css.toString()
+
+
+def test_load_source_changed(path, cache_dir):
+    qstylizer.compiled.load(path, cache_dir=cache_dir)
+    with open(path, "a") as fileobj:
+        fileobj.write("QLabel { color: blue; }\n")
+    css = qstylizer.compiled.load(path, cache_dir=cache_dir)
+    assert css.QLabel.color.value == "blue"
+    assert len(os.listdir(cache_dir)) == 2
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"not json",
+    b"\xff\xfe",
+    b"\x80\x02N.",
+    b"[1, []]",
+    b"[2]",
+    b"[2, {}]",
+    b"[2, [[[], \"color\"]]]",
+    b"[2, [[[\"QWidget\"], \"color\", \"red\"]]]",
+    b"[2, [[[], \"QWidget\", null, \"dict\", \"QWidget\", 0]]]",
+    b"[2, [[[], \"QWidget\", null, \"ClassRule\", \"QWidget\", \"0\"]]]",
+    b"[2, [[[], \"color\", [\"red\"]]]]",
+    b"[2, [[[], 1, \"red\"]]]",
+])
+def test_load_invalid(path, cache_dir, content):
+    with open(path, "rb") as fileobj:
+        compiled_path = qstylizer.compiled.compiled_path(
+            fileobj.read(), cache_dir
+        )
+    os.makedirs(cache_dir)
+    with open(compiled_path, "wb") as fileobj:
+        fileobj.write(content)
+    css = qstylizer.compiled.load(path, cache_dir=cache_dir)
+    assert css == qstylizer.parser.parse(STYLESHEET)
+    assert qstylizer.compiled._read(compiled_path) is not None
+
+
+def test_load_pickle_not_run(path, cache_dir, tmpdir):
+    marker = tmpdir.join("marker")
+    # A pickle calling os.system("touch <marker>") when loaded.
+    content = (
+        b"cos\nsystem\n(S'touch " + str(marker).encode("utf-8") + b"'\ntR."
+    )
+    with open(path, "rb") as fileobj:
+        compiled_path = qstylizer.compiled.compiled_path(
+            fileobj.read(), cache_dir
+        )
+    os.makedirs(cache_dir)
+    with open(compiled_path, "wb") as fileobj:
+        fileobj.write(content)
+    css = qstylizer.compiled.load(path, cache_dir=cache_dir)
+    assert css == qstylizer.parser.parse(STYLESHEET)
+    assert not marker.exists()
+
+
+def test_records_valid(path, cache_dir):
+    css = qstylizer.compiled.load(path, cache_dir=cache_dir)
+    (name,) = os.listdir(cache_dir)
+    records = qstylizer.compiled._read(os.path.join(cache_dir, name))
+    assert records == css.to_records()
+
+
+def test_load_cache_not_writable(path, tmpdir):
+    cache_dir = tmpdir.join("file")
+    cache_dir.write("")
+    css = qstylizer.compiled.load(path, cache_dir=str(cache_dir))
+    assert css == qstylizer.parser.parse(STYLESHEET)
+
+
+def test_clear(path, cache_dir):
+    qstylizer.compiled.load(path, cache_dir=cache_dir)
+    qstylizer.compiled.clear(cache_dir)
+    assert os.listdir(cache_dir) == []
+
+
+def test_default_cache_dir(monkeypatch):
+    monkeypatch.setenv("QSTYLIZER_CACHE_DIR", "/tmp/compiled")
+    assert qstylizer.compiled.default_cache_dir() == "/tmp/compiled"
+    monkeypatch.delenv("QSTYLIZER_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", "/tmp/cache")
+    assert qstylizer.compiled.default_cache_dir() == os.path.join(
+        "/tmp/cache", "qstylizer"
+    )
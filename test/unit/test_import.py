@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import qstylizer
+
+
+#: Modules which must only be imported when they are used.
+LAZY_MODULES = ["tinycss2", "inflection", "multiprocessing"]
+
+#: Budget of the time spent importing the qstylizer modules themselves,
+#: without their dependencies, in microseconds.
+BUDGET = 25000
+
+
+def import_times(module):
+    """Return the self and cumulative import times of each module imported.
+
+    Use the output of ``python -X importtime``.
+
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(qstylizer.__file__))
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stderr=subprocess.STDOUT, env=env, universal_newlines=True
+    )
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative, name = line.split(":", 1)[1].split("|")
+        times[name.strip()] = (int(self_time), int(cumulative))
+    return times
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="-X importtime requires Python 3.7"
+)
+@pytest.mark.parametrize("module", ["qstylizer.style", "qstylizer.parser"])
+def test_import_time(module):
+    times = import_times(module)
+    assert module in times
+    for name in LAZY_MODULES:
+        assert name not in times
+    cost = sum(
+        self_time for name, (self_time, _) in times.items()
+        if name.split(".")[0] == "qstylizer"
+    )
+    assert cost < BUDGET
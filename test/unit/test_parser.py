@@ -0,0 +1,328 @@
+# coding: utf-8
+
+import io
+import sys
+
+import pytest
+
+import qstylizer.parser
+
+
+STYLESHEET = u"""
+/* A comment with a brace } and a quote " */
+QWidget {
+    color: red;
+    font-family: "Brace } and \\" quote";
+}
+QLabel#label { qproperty-text: 'it\\'s {'; }
+QCheckBox::indicator:hover, QComboBox {
+    /* } */
+    border: 1px solid green;
+    image: url(a\\}b.png);
+}
+QPushButton { }
+QLabel { qproperty-text: "café — €"; }
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1024])
+def test_iter_blocks(chunk_size):
+    chunks = [
+        STYLESHEET[index:index + chunk_size]
+        for index in range(0, len(STYLESHEET), chunk_size)
+    ]
+    blocks = list(qstylizer.parser._iter_blocks(chunks))
+    assert "".join(block for block, _ in blocks) == STYLESHEET.rstrip()
+    assert [block[:opening].split("\n")[-1] for block, opening in blocks] == [
+        "QWidget ",
+        "QLabel#label ",
+        "QCheckBox::indicator:hover, QComboBox ",
+        "QPushButton ",
+        "QLabel ",
+    ]
+    assert all(block.endswith("}") for block, _ in blocks)
+
+
+def test_iter_blocks_trailing_text():
+    blocks = list(qstylizer.parser._iter_blocks(["a { b: c; } /* x */ d"]))
+    assert blocks == [("a { b: c; }", 2), (" /* x */ d", -1)]
+    blocks = list(qstylizer.parser._iter_blocks(["a { b: c; }\n\n"]))
+    assert blocks == [("a { b: c; }", 2)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+def test_iter_parse(chunk_size):
+    fileobj = io.StringIO(STYLESHEET)
+    result = list(qstylizer.parser.iter_parse(fileobj, chunk_size=chunk_size))
+    assert result == list(qstylizer.parser._parse_blocks(STYLESHEET))
+    assert result[0] == (
+        "QWidget",
+        [("color", "red"), ("font-family", '"Brace } and \\" quote"')]
+    )
+    assert result[3] == ("QPushButton", [])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+def test_parse_file_bytes(chunk_size):
+    fileobj = io.BytesIO(STYLESHEET.encode("utf-8"))
+    css = qstylizer.parser.parse_file(fileobj, chunk_size=chunk_size)
+    assert css.toString() == qstylizer.parser.parse(STYLESHEET).toString()
+    assert css.QLabel["qproperty-text"].value == (
+        u'"café — €"'
+    )
+
+
+def test_parse_file_path(tmpdir):
+    path = tmpdir.join("style.qss")
+    path.write_text(STYLESHEET, encoding="utf-8")
+    css = qstylizer.parser.parse_file(str(path))
+    assert css == qstylizer.parser.parse(STYLESHEET)
+
+
+def test_parse_file_error():
+    fileobj = io.StringIO(u"QWidget { color: red; }\ncolor: blue;")
+    with pytest.raises(ValueError):
+        qstylizer.parser.parse_file(fileobj)
+
+
+def test_iter_mapped_blocks():
+    blocks = list(
+        qstylizer.parser._iter_mapped_blocks(STYLESHEET.encode("utf-8"), "utf-8")
+    )
+    assert blocks == list(qstylizer.parser._iter_blocks([STYLESHEET]))
+
+
+def test_parse_mmap(tmpdir):
+    path = tmpdir.join("style.qss")
+    path.write_text(STYLESHEET, encoding="utf-8")
+    css = qstylizer.parser.parse_mmap(str(path))
+    assert css == qstylizer.parser.parse(STYLESHEET)
+    assert css.QLabel["qproperty-text"].value == u'"café — €"'
+
+
+def test_parse_mmap_empty(tmpdir):
+    path = tmpdir.join("style.qss")
+    path.write_text(u"", encoding="utf-8")
+    assert qstylizer.parser.parse_mmap(str(path)).toString() == ""
+
+
+def test_parse_values_interned():
+    css = qstylizer.parser.parse(u"QWidget { border: 1px solid red; }")
+    other = qstylizer.parser.parse(u"QLabel { border:1px solid red }")
+    assert css.QWidget.border.value is other.QLabel.border.value
+
+
+@pytest.fixture
+def parse_cache():
+    qstylizer.parser.enable_cache(maxsize=2)
+    yield
+    qstylizer.parser.disable_cache()
+
+
+def test_parse_cache(parse_cache, mocker):
+    mocker.spy(qstylizer.parser, "_parse_blocks")
+    css = qstylizer.parser.parse(STYLESHEET)
+    cached = qstylizer.parser.parse(STYLESHEET)
+    assert qstylizer.parser._parse_blocks.call_count == 1
+    assert cached == css
+    assert cached is not css
+    cached.QWidget.color.setValue("blue")
+    assert qstylizer.parser.parse(STYLESHEET).QWidget.color.value == "red"
+    info = qstylizer.parser.cache_info()
+    assert (info.hits, info.misses, info.size) == (2, 1, 1)
+
+
+def test_parse_cache_eviction(parse_cache):
+    for stylesheet in ["A { color: red; }", "B { color: red; }", STYLESHEET]:
+        qstylizer.parser.parse(stylesheet)
+    qstylizer.parser.parse(STYLESHEET, lazy=True)
+    info = qstylizer.parser.cache_info()
+    assert (info.hits, info.misses, info.evictions) == (0, 3, 1)
+
+
+def test_parse_cache_disabled():
+    assert qstylizer.parser.cache_info() is None
+
+
+def test_parse_cache_maxbytes():
+    css = qstylizer.parser.parse(STYLESHEET)
+    css.toString()
+    size = qstylizer.parser._sizeof(STYLESHEET, css)
+    assert size > 2 * sys.getsizeof(STYLESHEET)
+    qstylizer.parser.enable_cache(maxbytes=size)
+    try:
+        qstylizer.parser.parse(STYLESHEET)
+        assert qstylizer.parser.cache_info().bytes == size
+        qstylizer.parser.parse(u"QLabel { color: red; }")
+        info = qstylizer.parser.cache_info()
+        assert (info.size, info.evictions) == (1, 1)
+    finally:
+        qstylizer.parser.disable_cache()
+
+
+def test_sizeof_counts_rules():
+    stylesheet = u"QWidget { color: red; }"
+    css = qstylizer.parser.parse(stylesheet)
+    size = qstylizer.parser._sizeof(stylesheet, css)
+    css.QLabel.color.setValue("red")
+    assert qstylizer.parser._sizeof(stylesheet, css) > size
+
+
+PLUGINS = [
+    u"QWidget { color: red; }\nQCheckBox::indicator { border: none; }\n",
+    u"QWidget { color: blue; margin: 1px; }\nQLabel { color: red; }\n",
+    u"QCheckBox::indicator:hover, QLabel { border: 1px solid; }\n",
+]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many(tmpdir, workers):
+    paths = []
+    for index, text in enumerate(PLUGINS):
+        path = tmpdir.join("plugin{0}.qss".format(index))
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    css = qstylizer.parser.parse_many(paths, workers=workers)
+    assert css == qstylizer.parser.parse(u"".join(PLUGINS))
+    assert css.QWidget.color.value == "blue"
+    assert list(css.keys()) == [
+        "QWidget", "QCheckBox", "QLabel", "QCheckBoxindicatorhover, QLabel"
+    ]
+
+
+def test_parse_many_empty():
+    assert qstylizer.parser.parse_many([]).toString() == ""
+
+
+def test_parse_many_error(tmpdir):
+    paths = []
+    for index, text in enumerate([PLUGINS[0], u"color: blue;"]):
+        path = tmpdir.join("plugin{0}.qss".format(index))
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    with pytest.raises(ValueError):
+        qstylizer.parser.parse_many(paths, workers=2)
+
+
+LAZY_STYLESHEET = u"""
+QTabBar::tab:top { color: green; }
+QTabBar::tab { top: 0; color: red; }
+QComboBox, QSpinBox { padding: 1px; }
+QFrame, QFrame::indicator { margin: 1px; border: 2px; }
+QWidget {
+    color: red;
+    /* border: 1px; */
+    background: url(a;b.png);
+}
+QWidget::item { color: blue; }
+QLabel { color: red; }
+QLabel { border: none; }
+QPushButton { }
+"""
+
+
+def test_parse_lazy():
+    css = qstylizer.parser.parse(LAZY_STYLESHEET, lazy=True)
+    eager = qstylizer.parser.parse(LAZY_STYLESHEET)
+    assert [rule.selector for rule in css._iter_rules()] == [
+        rule.selector for rule in eager._iter_rules()
+    ]
+    assert css.QWidget._deferred is not None
+    assert css.QComboBox._deferred is not None
+    assert css.QWidget._rule_block() == (
+        "QWidget {\n"
+        "    color: red;\n"
+        "    /* border: 1px; */\n"
+        "    background: url(a;b.png);\n"
+        "}\n"
+    )
+    assert css.QComboBox._rule_block() == "QComboBox { padding: 1px; }\n"
+    # Blocks creating rules, nested lists and repeated rules are built.
+    assert css.QTabBar.tab._deferred is None
+    assert css.QFrame._deferred is None
+    assert css.QLabel._deferred is None
+    assert css == eager
+    assert css.toString() == eager.toString()
+
+
+def test_parse_lazy_materialize():
+    css = qstylizer.parser.parse(LAZY_STYLESHEET, lazy=True)
+    rule = css.QWidget
+    assert rule._deferred is not None
+    assert rule.get("item") is not None
+    assert "border" not in rule
+    assert rule._deferred is not None
+    assert rule.get("color").value == "red"
+    assert rule._deferred is None
+    assert list(rule.keys()) == ["color", "background", "item"]
+    assert rule._rule_block() == (
+        "QWidget {\n"
+        "    color: red;\n"
+        "    background: url(ab.png);\n"
+        "}\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "access",
+    [
+        lambda rule: list(rule.items()),
+        lambda rule: len(rule),
+        lambda rule: rule.color.setValue("blue"),
+        lambda rule: rule.setValues(border="none"),
+        lambda rule: rule.__delitem__("item"),
+        lambda rule: rule.item.setValue("1"),
+    ],
+    ids=[
+        "with-items",
+        "with-len",
+        "with-descriptor",
+        "with-set-values",
+        "with-delete",
+        "with-child-value",
+    ]
+)
+def test_parse_lazy_access(access):
+    css = qstylizer.parser.parse(LAZY_STYLESHEET, lazy=True)
+    eager = qstylizer.parser.parse(LAZY_STYLESHEET)
+    access(css.QWidget)
+    access(eager.QWidget)
+    assert css.QWidget._rule_block() == eager.QWidget._rule_block()
+    assert css.QWidget._deferred is None
+    assert css == eager
+
+
+def test_parse_lazy_child_rule_order():
+    css = qstylizer.parser.parse(u"QWidget { color: red; }", lazy=True)
+    css.QWidget.hover.color.setValue("blue")
+    css.QWidget._materialize()
+    assert list(css.QWidget.keys()) == ["color", "hover"]
+    assert css.toString() == (
+        "QWidget {\n"
+        "    color: red;\n"
+        "}\n"
+        "QWidget:hover {\n"
+        "    color: blue;\n"
+        "}\n"
+    )
+
+
+def test_parse_lazy_deepcopy():
+    import copy
+    css = qstylizer.parser.parse(LAZY_STYLESHEET, lazy=True)
+    other = copy.deepcopy(css)
+    assert other.QComboBox._deferred is not None
+    assert other == css
+    assert other.QComboBox.padding.value == "1px"
+
+
+def test_parse_lazy_file(tmpdir):
+    path = tmpdir.join("style.qss")
+    path.write_text(LAZY_STYLESHEET, encoding="utf-8")
+    eager = qstylizer.parser.parse(LAZY_STYLESHEET)
+    css = qstylizer.parser.parse_file(str(path), lazy=True, chunk_size=7)
+    assert css.QWidget._deferred is not None
+    assert css == eager
+    css = qstylizer.parser.parse_mmap(str(path), lazy=True)
+    assert css.QWidget._deferred is not None
+    assert css == eager
@@ -0,0 +1,173 @@
+import textwrap
+
+import pytest
+
+import qstylizer
+import qstylizer.patch
+import qstylizer.parser
+import qstylizer.style
+
+
+OLD = """
+QWidget {
+    color: red;
+    background-color: black;
+}
+QCheckBox::indicator {
+    border: none;
+}
+QCheckBox::indicator:hover {
+    border: 1px solid green;
+}
+QTabBar::tab {
+    top: 0;
+}
+QTabBar::tab:top {
+    color: green;
+}
+"""
+
+NEW = """
+QWidget {
+    color: blue;
+}
+QTabBar::tab {
+    top: 1px;
+}
+QTabBar::tab:top {
+    color: green;
+}
+QFrame#objectName {
+    margin: 2px;
+}
+"""
+
+
+def _blocks(css):
+    return sorted(css.iter_chunks())
+
+
+@pytest.fixture
+def old():
+    return qstylizer.parser.parse(OLD)
+
+
+@pytest.fixture
+def new():
+    return qstylizer.parser.parse(NEW)
+
+
+def test_diff(old, new):
+    patch = qstylizer.diff(old, new)
+    assert isinstance(patch, qstylizer.patch.Patch)
+    assert patch.added_rules == ["QFrame", "QFrame#objectName"]
+    assert patch.removed_rules == [
+        "QCheckBox", "QCheckBox::indicator", "QCheckBox::indicator:hover"
+    ]
+    assert patch.added == [
+        qstylizer.patch.PropChange("QFrame#objectName", "margin", None, "2px"),
+    ]
+    assert patch.removed == [
+        qstylizer.patch.PropChange(
+            "QCheckBox::indicator", "border", "none", None
+        ),
+        qstylizer.patch.PropChange(
+            "QCheckBox::indicator:hover", "border", "1px solid green", None
+        ),
+        qstylizer.patch.PropChange(
+            "QWidget", "background-color", "black", None
+        ),
+    ]
+    assert patch.changed == [
+        qstylizer.patch.PropChange("QWidget", "color", "red", "blue"),
+        qstylizer.patch.PropChange("QTabBar::tab", "top", "0", "1px"),
+    ]
+    assert set(patch.selectors) == {
+        "QFrame", "QFrame#objectName", "QCheckBox", "QCheckBox::indicator",
+        "QCheckBox::indicator:hover", "QTabBar::tab", "QWidget",
+    }
+
+
+def test_diff_identical(old):
+    other = qstylizer.parser.parse(OLD)
+    patch = qstylizer.diff(old, other)
+    assert not patch
+    assert patch.selectors == []
+    assert not qstylizer.diff(old, old)
+
+
+def test_apply(old, new):
+    patch = qstylizer.diff(old, new)
+    patch.apply(old)
+    assert _blocks(old) == _blocks(new)
+    assert not qstylizer.diff(old, new)
+
+
+def test_apply_reversed(old, new):
+    patch = qstylizer.diff(new, old)
+    patch.apply(new)
+    assert _blocks(new) == _blocks(old)
+
+
+def test_apply_global_properties():
+    old = qstylizer.parser.parse("QWidget { color: red; }")
+    new = qstylizer.parser.parse("* { color: red; }")
+    qstylizer.diff(old, new).apply(old)
+    assert old.toString() == textwrap.dedent(
+        """
+        * {
+            color: red;
+        }
+        """
+    )[1:]
+
+
+def test_apply_changed_rule_class(css):
+    import qstylizer.style
+    new = qstylizer.style.StyleSheet()
+    css.QWidget["::item"].color.setValue("red")
+    new.QWidget[":item"].color.setValue("red")
+    qstylizer.diff(css, new).apply(css)
+    assert type(css.QWidget.item) is qstylizer.style.PseudoStateRule
+    assert css.toString() == new.toString()
+
+
+def test_diff_skips_unchanged_subtrees(mocker, old):
+    new = qstylizer.parser.parse(OLD)
+    new.QCheckBox.indicator.border.setValue("1px")
+    spy = mocker.spy(qstylizer.patch, "_properties")
+    patch = qstylizer.diff(old, new)
+    walked = [call[0][0].selector for call in spy.call_args_list]
+    assert walked == [
+        "QCheckBox::indicator", "QCheckBox::indicator",
+        "QCheckBox", "QCheckBox", "", "",
+    ]
+    assert patch.selectors == ["QCheckBox::indicator"]
+
+
+def test_diff_does_not_compare_unchanged_subtrees(mocker, old):
+    new = qstylizer.parser.parse(OLD)
+    new.QCheckBox.indicator.border.setValue("1px")
+    old.content_hash()
+    spy = mocker.spy(qstylizer.style.StyleRule, "__eq__")
+    patch = qstylizer.diff(old, new)
+    assert spy.call_count == 0
+    assert patch.selectors == ["QCheckBox::indicator"]
+
+
+@pytest.mark.parametrize(
+    "old_value, new_value", [(-1, -2), (1, True), (0, 0.0)],
+    ids=["with-same-hash", "with-bool", "with-float"]
+)
+def test_diff_values_equal_or_same_hash(css, old_value, new_value):
+    import qstylizer.style
+    new = qstylizer.style.StyleSheet()
+    css.QWidget.margin.setValue(old_value)
+    new.QWidget.margin.setValue(new_value)
+    assert css.toString() != new.toString()
+    patch = qstylizer.diff(css, new)
+    assert patch.changed == [
+        qstylizer.patch.PropChange("QWidget", "margin", old_value, new_value)
+    ]
+    patch.apply(css)
+    assert css.toString() == new.toString()
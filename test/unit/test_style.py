@@ -1,7 +1,13 @@
 
 
+import copy
+import pickle
+
 import pytest
 
+import qstylizer.cache
+import qstylizer.descriptor.qclass
+import qstylizer.parser
 import qstylizer.style
 
 
@@ -200,7 +206,7 @@ def test_create_child_rule_list(mocker, style_class, css):
 @pytest.mark.parametrize(
     "selector, "
     "curr_name, "
-    "find_or_create_child_rule_call_count, ",
+    "find_child_rule_call_count, ",
     [
         (
             "QComboBox",
@@ -212,36 +218,78 @@ def test_create_child_rule_list(mocker, style_class, css):
             "QComboBox",
             1,
         ),
+        (
+            "QComboBox::indicator:!checked:hover",
+            "QComboBox",
+            3,
+        ),
     ],
     ids=[
         "with-single-style",
         "with-multiple-style",
+        "with-four-styles",
     ]
 )
 def test_create_child_rules(
     mocker, style_class, css, selector, curr_name,
-    find_or_create_child_rule_call_count
+    find_child_rule_call_count
 ):
     mocked_style = mocker.MagicMock()
-    mocked_split_selector = mocker.patch.object(
-        style_class, "split_selector", return_value=[curr_name]
-    )
+    mocked_style.find_child_rule.return_value = mocked_style
     mocked_find_child_rule = mocker.patch.object(
         style_class, "find_child_rule", return_value=mocked_style
     )
-    mocker.patch.object(
+    mocked_create_child_rule = mocker.patch.object(
         style_class, "create_child_rule", return_value=mocked_style
     )
-    mocker.patch.object(
-        style_class, "find_or_create_child_rule", return_value=mocked_style
-    )
-    css.create_child_rules(selector)
-    mocked_split_selector.assert_called_once_with(selector)
+    assert css.create_child_rules(selector) == mocked_style
     mocked_find_child_rule.assert_called_once_with(curr_name)
+    assert mocked_create_child_rule.call_count == 0
     assert (
-        mocked_style.find_or_create_child_rule.call_count ==
-        find_or_create_child_rule_call_count
+        mocked_style.find_child_rule.call_count ==
+        find_child_rule_call_count
+    )
+
+
+@pytest.mark.parametrize(
+    "selector, expected",
+    [
+        ("*", [("universal", "*")]),
+        (
+            "QTreeView::branch:!has-children:adjoins-item",
+            [
+                ("class", "QTreeView"), ("subcontrol", "::branch"),
+                ("negated", ":!has_children"),
+                ("pseudostate", ":adjoins_item")
+            ]
+        ),
+        (
+            "QWidget QLabel#name > QFrame",
+            [
+                ("class", "QWidget"), ("descendant", " QLabel"),
+                ("object", "#name"), ("child", " > QFrame")
+            ]
+        ),
+        (
+            'indicator[flat="true"]',
+            [("name", "indicator"), ("property", '[flat="true"]')]
+        ),
+    ],
+    ids=[
+        "with-universal",
+        "with-subcontrol-and-pseudostates",
+        "with-combinators",
+        "with-property",
+    ]
+)
+def test_tokenize_selector(selector, expected):
+    qstylizer.style.clear_caches()
+    tokens = qstylizer.style.tokenize_selector(selector)
+    assert tokens == tuple(
+        qstylizer.style.SelectorToken(*token) for token in expected
     )
+    assert qstylizer.style.tokenize_selector(selector) is tokens
+    assert qstylizer.style.SELECTOR_TOKENS.info().hits == 1
 
 
 def test_create_child_rule(mocker, style_class, css):
@@ -274,7 +322,8 @@ def test_set_child_rule(css):
 def test_add_child_rule(css):
     rule = qstylizer.style.ClassRule("QUnknown")
     css._add_child_rule(rule)
-    assert rule in css._child_rules.values()
+    assert id(rule) in css._rule_index
+    assert list(css._iter_rules())[0] is rule
 
 
 def test_selector():
@@ -339,3 +388,502 @@ def test_style_child_rule_class(mocker, style_class, css, name, expected):
     import qstylizer.style
     assert qstylizer.style.rule_class(name).__name__ == expected
 
+
+def _legacy_rule_class(name):
+    """Copy of rule_class before the dispatch table."""
+    if "!" in name:
+        name = name.replace("!", "")
+        name = name[0].lower() + name[1:]
+    class_ = qstylizer.style.StyleRule
+    if name.startswith("::") or name in qstylizer.style.QSUBCONTROLS:
+        class_ = qstylizer.style.SubControlRule
+    elif name.startswith(":") or name in qstylizer.style.QPSEUDOSTATES:
+        class_ = qstylizer.style.PseudoStateRule
+    elif name.startswith("#"):
+        class_ = qstylizer.style.ObjectRule
+    elif name.startswith(" "):
+        class_ = qstylizer.style.ChildClassRule
+    elif name in qstylizer.style.QCLASSES or name.startswith("Q"):
+        class_ = qstylizer.style.ClassRule
+    elif "=" in name:
+        class_ = qstylizer.style.ObjectPropRule
+    return class_
+
+
+def test_rule_class_matches_legacy():
+    qstylizer.style.clear_caches()
+    descriptor_names = (
+        qstylizer.style.QPROPERTIES | qstylizer.style.QSUBCONTROLS |
+        qstylizer.style.QPSEUDOSTATES | qstylizer.style.QPSEUDOPROPS |
+        qstylizer.style.QCLASSES
+    )
+    bases = set()
+    for name in descriptor_names:
+        bases.update([
+            name, name.replace("-", "_"), name.upper(), name.capitalize(),
+            name + "=1", name + "_x", name[1:]
+        ])
+    bases.update(["", "*", "[echoMode=2]", "a=b", "Qq", "q"])
+    names = set(
+        prefix + base
+        for prefix in [
+            "", "::", ":", ":!", "!", "::!", "#", " ", " > ", "Q", "[", "!Q"
+        ]
+        for base in bases
+        if prefix + base != "!"
+    )
+    for _ in range(2):
+        for name in sorted(names):
+            assert (
+                qstylizer.style.rule_class(name) is _legacy_rule_class(name)
+            ), name
+
+
+def test_attribute_tables_shared_per_class(css):
+    rule = css.QCheckBox
+    other = css.QComboBox
+    assert "_attributes" not in rule.__dict__
+    assert rule._attributes is other._attributes
+    assert rule._attr_options is qstylizer.style.ClassRule._attr_options
+    assert "indicator" in qstylizer.style.ClassRule._attr_options
+    assert "indicator" not in qstylizer.style.StyleRule._attr_options
+
+
+def test_descriptor_get(css):
+    descriptor = qstylizer.style.StyleSheet.QPushButton
+    assert isinstance(
+        descriptor, qstylizer.descriptor.qclass.ClassStyleDescriptor
+    )
+    assert descriptor.rule_cls is qstylizer.style.ClassRule
+    rule = css.QPushButton
+    assert isinstance(rule, qstylizer.style.ClassRule)
+    assert css.QPushButton is rule
+    assert list(css.keys()) == ["QPushButton"]
+
+
+def test_descriptor_get_deferred():
+    css = qstylizer.parser.parse("QWidget { color: red; }", lazy=True)
+    assert css.QWidget._deferred is not None
+    assert css.QWidget.color.value == "red"
+    assert list(css.QWidget.keys()) == ["color"]
+
+
+def test_sanitize_key_cache(css):
+    qstylizer.style.clear_caches()
+    assert css._sanitize_key("background_color") == "background-color"
+    assert css._sanitize_key("background_color") == "background-color"
+    info = qstylizer.style.SANITIZED_KEYS.info()
+    assert info.hits == 1
+    assert info.misses == 1
+    qstylizer.style.clear_caches()
+    assert qstylizer.style.SANITIZED_KEYS.info().size == 0
+
+
+def test_sanitize_list_key_cache():
+    qstylizer.style.clear_caches()
+    rule_list = qstylizer.style.StyleRuleList
+    assert rule_list._sanitize_key("QFrame,\nQLabel") == "QFrame,QLabel"
+    assert rule_list._sanitize_key("QFrame,\nQLabel") == "QFrame,QLabel"
+    assert qstylizer.style.SANITIZED_LIST_KEYS.info().hits == 1
+
+
+def test_sanitize_key_interned(css):
+    qstylizer.style.clear_caches()
+    key = css._sanitize_key("background_color")
+    qstylizer.style.SANITIZED_KEYS.clear()
+    assert css._sanitize_key("backgroundColor") is key
+    assert qstylizer.style.NAMES.info() == qstylizer.cache.InternInfo(
+        total=2, unique=1, maxsize=qstylizer.style.NAMES.maxsize
+    )
+
+
+def test_names_count_every_use(css):
+    qstylizer.style.clear_caches()
+    for index in range(10):
+        css["#object{0}".format(index)].hover.color.setValue("red")
+    info = qstylizer.style.NAMES.info()
+    assert info.unique == 12
+    assert info.total >= 30
+    assert info.total > info.unique
+
+
+def test_attribute_name_cache(css):
+    qstylizer.style.clear_caches()
+    css["background-color"] = "red"
+    css["background-color"] = "blue"
+    assert css.backgroundColor.value == "blue"
+    assert qstylizer.style.ATTRIBUTE_NAMES.info().hits == 1
+
+
+def test_selector_cached(css, mocker):
+    rule = css.QCheckBox.indicator
+    assert rule.selector == "QCheckBox::indicator"
+    mocker.patch.object(qstylizer.style.StyleRule, "name", None)
+    assert rule.selector == "QCheckBox::indicator"
+    assert rule._selector == "QCheckBox::indicator"
+
+
+def test_selector_invalidated_on_reparent(css):
+    rule = css.QCheckBox.indicator.hover
+    assert rule.selector == "QCheckBox::indicator:hover"
+    css.QCheckBox.indicator._parent = css.QComboBox
+    assert rule.selector == "QComboBox::indicator:hover"
+
+
+def test_selector_invalidated_on_rename(css):
+    rule = css.QCheckBox.indicator.hover
+    assert rule.selector == "QCheckBox::indicator:hover"
+    css.QCheckBox._name = "QRadioButton"
+    assert rule.selector == "QRadioButton::indicator:hover"
+
+
+def test_selector_invalidated_on_leaf_change(css):
+    rule = css["aaaaa"]["bbbbb"]
+    prop = rule.color
+    assert rule.selector == "aaaaa:bbbbb"
+    assert prop.selector == "aaaaa:bbbbb:color"
+    rule["ccccc"]
+    assert rule.selector == "aaaaa::bbbbb"
+    assert prop.selector == "aaaaa::bbbbb:color"
+    del rule["ccccc"]
+    assert rule.selector == "aaaaa:bbbbb"
+
+
+def test_selector_invalidated_on_deepcopy(css):
+    rule = css.QCheckBox.indicator
+    assert rule.hover.selector == "QCheckBox::indicator:hover"
+    css.QComboBox.indicator = copy.deepcopy(rule)
+    assert css.QComboBox.indicator.selector == "QComboBox::indicator"
+    assert css.QComboBox.indicator.hover.selector == (
+        "QComboBox::indicator:hover"
+    )
+    assert rule.hover.selector == "QCheckBox::indicator:hover"
+
+
+def test_rule_index_owned_by_root(css):
+    css.QCheckBox.indicator.hover.color.setValue("red")
+    assert len(css._rule_index) == 3
+    assert css.QCheckBox._rule_index is None
+    assert css.QCheckBox.indicator._rule_index is None
+
+
+def test_clear_removes_from_index(css):
+    css.QCheckBox.indicator.hover.color.setValue("red")
+    css.QCheckBox.clear()
+    assert list(css._iter_rules()) == [css.QCheckBox]
+
+
+def test_rule_count(css):
+    rule = css.QCheckBox
+    rule.color.setValue("red")
+    assert rule._rule_count == 0
+    assert rule.is_leaf()
+    rule.indicator.color.setValue("blue")
+    rule.hover.color.setValue("blue")
+    assert rule._rule_count == 2
+    rule.indicator = "none"
+    assert rule._rule_count == 2
+    del rule.hover
+    assert rule._rule_count == 1
+    assert not rule.is_leaf()
+    rule.clear()
+    assert rule._rule_count == 0
+    assert rule.is_leaf()
+
+
+def test_prop_rule_compact(css):
+    prop = css.QCheckBox.color
+    assert not hasattr(prop, "__dict__")
+    assert not isinstance(prop, dict)
+    prop.setValue("red;")
+    assert prop.value == "red"
+    assert prop.name == "color"
+    assert prop.parent is css.QCheckBox
+    assert prop.selector == "QCheckBox:color"
+    assert css.color.selector == "color"
+    assert repr(prop) == "<PropRule name='color' value='red' />"
+    assert prop.toString() == ""
+
+
+def test_prop_rule_equality():
+    rule = qstylizer.style.PropRule("color", "red")
+    assert rule == qstylizer.style.PropRule("color", "red")
+    assert rule != qstylizer.style.PropRule("color", "blue")
+    assert rule != qstylizer.style.PropRule("border", "red")
+
+
+def test_prop_rule_deepcopy(css):
+    css.QCheckBox.color.setValue("red")
+    rule = copy.deepcopy(css.QCheckBox)
+    assert rule.color is not css.QCheckBox.color
+    assert rule.color == css.QCheckBox.color
+    assert rule.color.parent is rule
+
+
+def test_rule_block_cached(css, mocker):
+    css.QFrame.color.setValue("green")
+    assert css.QFrame.toString() == "QFrame {\n    color: green;\n}\n"
+    mocked_format = mocker.patch.object(
+        qstylizer.style.StyleRule, "_format_rule_block"
+    )
+    assert css.QFrame.toString() == "QFrame {\n    color: green;\n}\n"
+    assert not mocked_format.called
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda css: css.QFrame.color.setValue("red"),
+        lambda css: css.QFrame.setValues(border="none"),
+        lambda css: css.QFrame.__delattr__("color"),
+        lambda css: css.QFrame.set_child_rule("margin", 0),
+        lambda css: css.QFrame.clear(),
+    ],
+    ids=[
+        "with-set-value",
+        "with-set-values",
+        "with-delattr",
+        "with-set-child-rule",
+        "with-clear",
+    ]
+)
+def test_rule_block_dirty(css, change):
+    css.QFrame.color.setValue("green")
+    css.toString()
+    assert css.QFrame._block is not None
+    change(css)
+    assert css.QFrame._block is None
+
+
+def test_global_rule_block_dirty(css):
+    css["*"].color.setValue("green")
+    assert css.toString() == "* {\n    color: green;\n}\n"
+    css["*"].color.setValue("red")
+    assert css.toString() == "* {\n    color: red;\n}\n"
+
+
+def test_content_hash(css):
+    css.QCheckBox.indicator.color.setValue("red")
+    css.QFrame.color.setValue("green")
+    before = css.content_hash()
+    assert css.content_hash() == before
+    assert css._hash == before
+    assert copy.deepcopy(css).content_hash() == before
+    css.QCheckBox.indicator.color.setValue("blue")
+    assert css._hash is None
+    assert css.QFrame._hash is not None
+    assert css.content_hash() != before
+    css.QCheckBox.indicator.color.setValue("red")
+    assert css.content_hash() == before
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda css: css.QFrame.color.setValue("red"),
+        lambda css: css.QFrame.setValue("red"),
+        lambda css: css.QFrame.hover.color.setValue("red"),
+        lambda css: css.QFrame.__delattr__("color"),
+        lambda css: css.QFrame.clear(),
+        lambda css: setattr(css.QFrame, "_name", "QLabel"),
+    ],
+    ids=[
+        "with-prop-value",
+        "with-rule-value",
+        "with-new-rule",
+        "with-delete",
+        "with-clear",
+        "with-rename",
+    ]
+)
+def test_content_hash_invalidated(css, change):
+    css.QFrame.color.setValue("green")
+    before = css.content_hash()
+    change(css)
+    assert css.content_hash() != before
+
+
+@pytest.mark.parametrize(
+    "value, other", [(-1, -2), (1, True)], ids=["with-same-hash", "with-bool"]
+)
+def test_content_hash_values(css, value, other):
+    css.QFrame.margin.setValue(value)
+    before = css.content_hash()
+    css.QFrame.margin.setValue(other)
+    assert css.content_hash() != before
+
+
+def test_equality(css):
+    css.QCheckBox.indicator.color.setValue("red")
+    other = copy.deepcopy(css)
+    assert other == css
+    assert other.QCheckBox == css.QCheckBox
+    other.QCheckBox.indicator.color.setValue("blue")
+    assert other != css
+    assert other.QCheckBox != css.QCheckBox
+    assert css.QCheckBox != css.QComboBox
+    css.QFrame.margin.setValue(1)
+    other = copy.deepcopy(css)
+    other.QFrame.margin.setValue(True)
+    assert other != css
+    assert other.QFrame != css.QFrame
+    assert other.QFrame.margin != css.QFrame.margin
+    assert other.toString() != css.toString()
+
+
+def test_set_props(css, mocker):
+    rule = css.QCheckBox
+    rule.color.setValue("red")
+    mocker.spy(rule, "_mark_dirty")
+    rule._set_props([
+        ("border", "1px; solid"), ("color", "blue"), ("top", "0"),
+        ("custom_prop", "1"),
+    ])
+    assert list(rule.keys()) == ["color", "border", "top", "custom-prop"]
+    assert isinstance(rule["border"], qstylizer.style.PropRule)
+    assert rule["border"].value == "1px solid"
+    assert rule["border"].parent is rule
+    assert rule["color"].value == "blue"
+    assert isinstance(rule["top"], qstylizer.style.PseudoPropRule)
+    assert rule["top"].value == "0"
+    assert rule._rule_count == 1
+    rule._mark_dirty.reset_mock()
+    rule._set_props([("margin", "0"), ("padding", "0")])
+    assert rule._mark_dirty.call_count == 1
+    assert rule.toString() == (
+        "QCheckBox {\n"
+        "    color: blue;\n"
+        "    border: 1px solid;\n"
+        "    top: 0;\n"
+        "    custom-prop: 1;\n"
+        "    margin: 0;\n"
+        "    padding: 0;\n"
+        "}\n"
+    )
+
+
+def test_records(css):
+    css.color.setValue("green")
+    css.QCheckBox.indicator.border.setValue("none")
+    css.QFrame.color.setValue("red")
+    css.QCheckBox.top.setValue("1px")
+    css["QLabel, QFrame::item"].margin.setValue("0")
+    records = css.to_records()
+    assert records[:4] == [
+        ((), "color", "green"),
+        ((), "QCheckBox", None, "ClassRule", "QCheckBox", 0),
+        (("QCheckBox",), "indicator", None, "SubControlRule", "indicator", 1),
+        (("QCheckBox", "indicator"), "border", "none"),
+    ]
+    assert records[1][1] is records[2][0][0]
+
+
+def test_records_round_trip(css):
+    css.color.setValue("green")
+    css.QCheckBox.indicator.border.setValue("none")
+    css.QFrame.color.setValue("red")
+    css.QCheckBox.hover.top.setValue("1px")
+    css["QLabel, QFrame::item"].margin.setValue("0")
+    css['QLineEdit[echoMode="2"]'].background.setValue("none")
+    records = pickle.loads(pickle.dumps(css.to_records()))
+    result = qstylizer.style.StyleSheet.from_records(records)
+    assert result == css
+    assert result.toString() == css.toString()
+    assert result.QCheckBox.hover.parent is result.QCheckBox
+    assert result.QCheckBox._rule_count == 2
+    result.QCheckBox.indicator.border.setValue("1px")
+    css.QCheckBox.indicator.border.setValue("1px")
+    assert result.toString() == css.toString()
+
+
+def test_from_records_without_init(css, mocker):
+    css.QCheckBox.indicator.border.setValue("none")
+    css.QCheckBox.hover.top.setValue("1px")
+    records = css.to_records()
+    mocker.spy(qstylizer.style.StyleRule, "__init__")
+    result = qstylizer.style.StyleSheet.from_records(records)
+    assert qstylizer.style.StyleRule.__init__.call_count == 1
+    assert result.toString() == css.toString()
+    assert result.QCheckBox.indicator.selector == "QCheckBox::indicator"
+    result.QCheckBox.indicator.border.setValue("1px")
+    assert "border: 1px;" in result.toString()
+    assert result.content_hash() != css.content_hash()
+
+
+@pytest.mark.parametrize("protocol", range(pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle_round_trip(css, protocol):
+    css.color.setValue("green")
+    css.QCheckBox.indicator.border.setValue("none")
+    css.QCheckBox.hover.top.setValue("1px")
+    css["QLabel, QFrame::item"].margin.setValue("0")
+    result = pickle.loads(pickle.dumps(css, protocol))
+    assert result == css
+    assert result.toString() == css.toString()
+    assert result.QCheckBox.hover.parent is result.QCheckBox
+    assert result.QCheckBox.hover.top.parent is result.QCheckBox.hover
+    result.QCheckBox.indicator.border.setValue("1px")
+    result.QFrame.color.setValue("red")
+    css.QCheckBox.indicator.border.setValue("1px")
+    css.QFrame.color.setValue("red")
+    assert result.toString() == css.toString()
+
+
+@pytest.mark.parametrize("protocol", range(pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle_prop_rule(css, protocol):
+    css.QCheckBox.color.setValue("red")
+    prop = css.QCheckBox.color
+    result = pickle.loads(pickle.dumps(prop, protocol))
+    assert result.name == "color"
+    assert result.value == "red"
+    assert result.parent == css.QCheckBox
+
+
+def test_deepcopy_copy_on_write(css):
+    css.QCheckBox.color.setValue("red")
+    css.QCheckBox.indicator.border.setValue("none")
+    css.QCheckBox.margin.setValue("0")
+    css.QFrame.color.setValue("blue")
+    css.QCheckBox.hover.color.setValue("green")
+    expected = css.toString()
+    other = copy.deepcopy(css)
+    third = copy.deepcopy(css)
+    assert other.QCheckBox._deferred[0] is third.QCheckBox._deferred[0]
+    assert other.toString() == expected
+    assert other.QCheckBox._deferred is not None
+    assert [rule.selector for rule in other._iter_rules()] == [
+        rule.selector for rule in css._iter_rules()
+    ]
+
+    css.QCheckBox.color.setValue("yellow")
+    css.QCheckBox.indicator.border.setValue("1px")
+    assert other.toString() == expected
+    assert list(other.QCheckBox.keys()) == [
+        "color", "indicator", "margin", "hover"
+    ]
+    assert other.QCheckBox.color.value == "red"
+    assert other.QCheckBox.color.parent is other.QCheckBox
+    assert other.QCheckBox.indicator.border.value == "none"
+
+    third.QCheckBox.padding.setValue("1px")
+    third.QCheckBox.color.setValue("black")
+    assert list(third.QCheckBox.keys()) == [
+        "color", "indicator", "margin", "hover", "padding"
+    ]
+    assert css.QCheckBox.color.value == "yellow"
+    assert "padding" not in css.QCheckBox
+
+
+def test_deepcopy_copy_on_write_new_rule(css):
+    css.QCheckBox.color.setValue("red")
+    other = copy.deepcopy(css)
+    other.QCheckBox.pressed.color.setValue("blue")
+    assert other.QCheckBox._deferred is not None
+    assert list(other.QCheckBox.keys()) == ["color", "pressed"]
+    assert other.toString() == (
+        "QCheckBox {\n"
+        "    color: red;\n"
+        "}\n"
+        "QCheckBox:pressed {\n"
+        "    color: blue;\n"
+        "}\n"
+    )